@@ -1,10 +1,11 @@
 import streamlit as st
-from jikanpy import Jikan
 from typing import Optional, Dict, List
 import time
 
-# Initialize Jikan client
-jikan = Jikan()
+# Run from the repository root with ``python -m streamlit run`` (which puts
+# the root on sys.path) until this page moves into pages/
+from retro import jikan
+from retro.anime_index import load_index, to_card
 
 def get_anime_recommendations(genres: List[str], rating: str = "g") -> List[Dict]:
     """Get anime recommendations based on genres and rating"""
@@ -22,31 +23,32 @@ def get_anime_recommendations(genres: List[str], rating: str = "g") -> List[Dict
         "Sci-Fi": 24
     }
     
-    selected_genres = [str(genre_ids[g]) for g in genres if g in genre_ids]
+    selected_genres = [genre_ids[g] for g in genres if g in genre_ids]
     
-    # Build search parameters for Jikan API
-    parameters = {
-        "genres": ",".join(selected_genres) if selected_genres else None,
-        "rating": rating,
-        "page": 1,
-        "limit": 20,
-        "sfw": True
-    }
+    # Answer from the prebuilt local index when there is one
+    index = load_index()
+    if index is not None:
+        return [to_card(r) for r in index.filter(selected_genres, rating=rating, sfw=True, limit=20)]
     
     try:
-        # Search anime using Jikan API
-        response = jikan.search('anime', query='', parameters=parameters)
-        return response.get('data', [])
+        # Search anime using the cached Jikan client
+        return jikan.search_anime(selected_genres, rating=rating, page=1, limit=20, sfw=True)
     except Exception as e:
         st.error(f"Error fetching anime: {str(e)}")
         return []
 
 def get_seasonal_anime(season: str, year: int) -> List[Dict]:
     """Get seasonal anime recommendations"""
+    # Answer from the prebuilt local index when it covers the season
+    index = load_index()
+    if index is not None:
+        records = index.season(year, season)
+        if records is not None:
+            return [to_card(r) for r in records]
+    
     try:
-        # Get seasonal anime using Jikan API
-        response = jikan.seasons(year=year, season=season)
-        return response.get('data', [])
+        # Get seasonal anime using the cached Jikan client
+        return jikan.seasonal_anime(year, season)
     except Exception as e:
         st.error(f"Error fetching seasonal anime: {str(e)}")
         return []
@@ -54,9 +56,8 @@ def get_seasonal_anime(season: str, year: int) -> List[Dict]:
 def get_anime_details(anime_id: int) -> Optional[Dict]:
     """Get detailed information about a specific anime"""
     try:
-        # Get anime details using Jikan API
-        response = jikan.anime(anime_id, extension='full')
-        return response.get('data')
+        # Get anime details using the cached Jikan client
+        return jikan.anime_details(anime_id)
     except Exception as e:
         st.error(f"Error fetching anime details: {str(e)}")
         return None
@@ -178,9 +179,8 @@ def display_anime_card(anime: Dict):
 def get_suggested_anime() -> List[Dict]:
     """Get suggested anime for the user"""
     try:
-        # Get top anime using Jikan API
-        response = jikan.top(type='anime', page=1)
-        return response.get('data', [])
+        # Get top anime using the cached Jikan client
+        return jikan.top_anime(page=1)
     except Exception as e:
         st.error(f"Error fetching suggested anime: {str(e)}")
         return []
@@ -1,107 +1,54 @@
 import streamlit as st
 
-def main():
-    st.title("🎵 Spotify Recommendations")
-    
-    st.info("""
-    ### Coming Soon!
-    
-    We're working on bringing you personalized Spotify music recommendations based on your mood, age, and preferences.
-    Stay tuned for updates!
-    """)
-    
-    # Preserving existing code as comments for future implementation
-    '''
-    import spotipy
-    import webbrowser
-    import json
-    import random
-
-    # Spotify API credentials
-    username = 'Your username'  # User needs to provide their Spotify username
-    CLIENT_ID = "Your Client ID"
-    CLIENT_SECRET = "Your Client Secret"
-    REDIRECT_URI = "http://google.com/callback/"
-
-    def initialize_spotify():
-        try:
-            # Create OAuth object
-            oauth_object = spotipy.SpotifyOAuth(
-                client_id=CLIENT_ID,
-                client_secret=CLIENT_SECRET,
-                redirect_uri=REDIRECT_URI
-            )
-            
-            # Get access token
-            token_dict = oauth_object.get_access_token()
-            token = token_dict['access_token']
-            
-            # Create Spotify object
-            spotify_object = spotipy.Spotify(auth=token)
-            
-            return spotify_object
-        except Exception as e:
-            st.error(f"Authentication failed: {e}")
-            return None
-
-    # Load search queries
-    with open('search_queries.json', 'r', encoding='utf-8') as f:
-        SEARCH_QUERIES = json.load(f)
+# Run from the repository root with ``python -m streamlit run`` (which puts
+# the root on sys.path) until this page moves into pages/
+from retro import spotify
+from retro.state import CursorMap
 
-    # Track iterations and current topic
-    if 'spotify_topic_iterations' not in st.session_state:
-        st.session_state.spotify_topic_iterations = {}
-    if 'spotify_current_topic' not in st.session_state:
-        st.session_state.spotify_current_topic = {}
+# Per-session position in each query's track pool
+if 'spotify_cursors' not in st.session_state:
+    st.session_state.spotify_cursors = CursorMap()
 
-    def get_age_group(age):
-        """
-        Determine age group based on age
-        """
-        if age <= 12:
-            return "kids"
-        elif 13 <= age <= 19:
-            return "teens"
-        else:
-            return "adults"
+def get_age_group(age):
+    """
+    Determine age group based on age
+    """
+    if age <= 12:
+        return "kids"
+    elif 13 <= age <= 19:
+        return "teens"
+    else:
+        return "adults"
 
-    def get_track_recommendation(spotify_object, mood, age_group):
-        """
-        Get a track recommendation based on mood and age group
-        """
-        try:
-            if spotify_object is None:
-                st.error("Spotify authentication required")
-                return None
-
-            # Create search query based on mood and age group
-            search_query = f"{mood} {age_group} music"
-            
-            # Search for track
-            results = spotify_object.search(search_query, 1, 0, "track")
-            
-            if results and 'tracks' in results:
-                songs_dict = results['tracks']
-                song_items = songs_dict['items']
-                if song_items:
-                    track = song_items[0]
-                    return {
-                        'name': track['name'],
-                        'artist': track['artists'][0]['name'],
-                        'external_url': track['external_urls']['spotify']
-                    }
-            return None
-            
-        except Exception as e:
-            st.error(f"An error occurred: {e}")
-            return None
-
-    # Initialize Spotify on first run
-    if 'spotify_object' not in st.session_state:
-        st.session_state.spotify_object = initialize_spotify()
+def get_track_recommendation(mood, age_group):
+    """
+    Get a track recommendation based on mood and age group
+    """
+    try:
+        # Create search query based on mood and age group
+        search_query = f"{mood} {age_group} music"
+        
+        # Walk this session's cursor through the cached pool of ~50 tracks
+        return spotify.next_track(st.session_state.spotify_cursors, search_query)
+        
+    except spotify.SpotifyAuthError as e:
+        st.error(f"Authentication failed: {e}")
+        return None
+    except Exception as e:
+        st.error(f"An error occurred: {e}")
+        return None
 
-    if st.session_state.spotify_object is None:
-        st.warning("Please authenticate with Spotify to continue")
+def main():
+    st.title("🎵 Spotify Recommendations")
+    
+    # App credentials (client ID and secret) are all we need: no user login
+    if spotify.credentials() is None:
+        st.info("""
+        ### Coming Soon!
+        
+        We're working on bringing you personalized Spotify music recommendations based on your mood, age, and preferences.
+        Stay tuned for updates!
+        """)
         return
 
     with st.container():
@@ -129,19 +76,15 @@ def main():
         col1, col2, col3 = st.columns([1, 2, 1])
         with col2:
             if st.button("Get Recommendation", use_container_width=True):
-                track = get_track_recommendation(st.session_state.spotify_object, mood, age_group)
+                track = get_track_recommendation(mood, age_group)
                 if track:
                     st.markdown(f"### {track['name']}")
                     st.markdown(f"**Artist:** {track['artist']}")
                     st.markdown(f"[Open in Spotify]({track['external_url']})")
                 else:
                     st.warning("No track found. Please try different preferences.")
-        
-        # Reset the flag
-        st.session_state.get_new_spotify_recommendation = False
-        else:
-            st.info("👆 Click 'Get Recommendation' above to start!")
-    '''
+            else:
+                st.info("👆 Click 'Get Recommendation' above to start!")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -1,5 +1,4 @@
 import streamlit as st
-import streamlit.components.v1 as components
 
 def main():
     st.set_page_config(
@@ -62,6 +61,16 @@ def main():
         </div>
     """, unsafe_allow_html=True)
 
+    # One-click bundle of every medium
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
+        st.page_link(
+            "pages/4_Recommend_Everything.py",
+            label="Recommend everything: a video, a song and a movie at once",
+            icon="🎮",
+            use_container_width=True
+        )
+
     # Current Features
     st.markdown("<h2 style='color: #FF4B4B;'>🎯 Current Features</h2>", unsafe_allow_html=True)
     
@@ -1,157 +1,45 @@
+import socket
 import streamlit as st
-import os
-from dotenv import load_dotenv
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-import json
-import random
-from collections import defaultdict
+from retro import deadline, progress, tracing, trending
+from retro.state import BoundedSet, MAX_SHOWN_VIDEOS, TopicTracker
+from retro.videos import LANGUAGES, MOODS, MUSIC, get_age_group
 
-# Load environment variables
-load_dotenv()
-
-# Language code mapping
-LANGUAGE_CODES = {
-    "Hindi": "hi",
-    "Tamil": "ta",
-    "Telugu": "te",
-    "Kannada": "kn",
-    "Malayalam": "ml"
-}
-
-# YouTube API setup
-OMDB_API_KEY=st.secrets["omdb_api_key"]
-YOUTUBE_API_KEY = st.secrets["youtube_api_key"]
-youtube = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
-
-# Load music search queries and fallback videos from JSON
-with open('music_queries.json', 'r', encoding='utf-8') as f:
-    MUSIC_QUERIES = json.load(f)
-with open('music_fallback_videos.json', 'r', encoding='utf-8') as f:
-    FALLBACK_VIDEOS = json.load(f)
+# Bring back this client's progress after a refresh or reconnect
+progress.restore_session(st.session_state, st.query_params)
 
 # Track iterations for each mood-age-language combination
-if 'music_topic_iterations' not in st.session_state:
-    st.session_state.music_topic_iterations = defaultdict(int)
-if 'music_current_topic' not in st.session_state:
-    st.session_state.music_current_topic = defaultdict(str)
-
-def get_age_group(age):
-    """
-    Determine age group based on age
-    """
-    if age <= 12:
-        return "kids"
-    elif 13 <= age <= 19:
-        return "teens"
-    else:
-        return "adults"
-
-def get_fallback_video(mood, age_group):
-    """
-    Get a fallback video ID based on mood and age group
-    """
-    try:
-        return FALLBACK_VIDEOS.get(mood, {}).get(age_group)
-    except Exception:
-        return None
+if 'music_topics' not in st.session_state:
+    st.session_state.music_topics = TopicTracker()
+# Videos already shown in this session, so ready queues don't repeat them
+if 'music_shown' not in st.session_state:
+    st.session_state.music_shown = BoundedSet(MAX_SHOWN_VIDEOS)
 
 def get_music_recommendation(mood, age_group, language):
     """
     Get a music video recommendation based on mood, age group, and language
     """
+    # Only imported on the recommendation path
+    from googleapiclient.errors import HttpError
+
     try:
-        # Get search queries for the selected mood, age group, and language
-        queries = MUSIC_QUERIES.get(mood, {}).get(age_group, {}).get(language, [])
-        
-        if not queries:
-            # If no queries found for the specific language, try English as fallback
-            queries = MUSIC_QUERIES.get(mood, {}).get(age_group, {}).get("English", [])
-            
-            if not queries:
-                # If still no queries found, use fallback video
-                fallback_id = get_fallback_video(mood, age_group)
-                if fallback_id:
-                    return {'id': fallback_id}
-                return None
-        
-        # Create a unique key for this mood-age-language combination
-        combo_key = f"{mood}-{age_group}-{language}"
-        
-        # If no current topic OR we've shown all 5 videos OR 20% random chance
-        if (not st.session_state.music_current_topic[combo_key] or 
-            st.session_state.music_topic_iterations[combo_key] >= 5 or 
-            random.random() < 0.2):
-            
-            # Pick new topic and reset iteration count
-            st.session_state.music_current_topic[combo_key] = random.choice(queries)
-            st.session_state.music_topic_iterations[combo_key] = 1
-        else:
-            # Increment iteration for current topic
-            st.session_state.music_topic_iterations[combo_key] += 1
-        
-        # Use current topic as query
-        query = st.session_state.music_current_topic[combo_key]
-        
-        # Calculate which video to show (0-4)
-        result_index = st.session_state.music_topic_iterations[combo_key] - 1
-        
-        # Search for music videos with language-specific parameters
-        search_response = youtube.search().list(
-            q=query,
-            part="snippet",
-            maxResults=5,
-            type="video",
-            videoCategoryId="10",  # Music category
-            videoDuration="medium",
-            videoEmbeddable="true",
-            videoSyndicated="true",
-            relevanceLanguage=LANGUAGE_CODES.get(language) if language != "English" else None
-        ).execute()
-        
-        # Process search results
-        if search_response.get('items'):
-            item = search_response['items'][result_index]
-            return {'id': item['id']['videoId']}
-        
-        # If no results found, try without language filter
-        if language != "English":
-            search_response = youtube.search().list(
-                q=query,
-                part="snippet",
-                maxResults=5,
-                type="video",
-                videoCategoryId="10",  # Music category
-                videoDuration="medium",
-                videoEmbeddable="true",
-                videoSyndicated="true"
-            ).execute()
-            
-            if search_response.get('items'):
-                item = search_response['items'][result_index]
-                return {'id': item['id']['videoId']}
-        
-        # If still no results found, use fallback video
-        fallback_id = get_fallback_video(mood, age_group)
-        if fallback_id:
-            return {'id': fallback_id}
-        
-        return None
-        
+        # Bound the whole click, however slow YouTube is
+        with deadline.budget():
+            video_id = MUSIC.recommend(
+                mood, age_group, language,
+                st.session_state.music_topics, st.session_state.music_shown
+            )
+    except (deadline.DeadlineExceeded, socket.timeout):
+        st.warning("YouTube is responding slowly. Using fallback video.")
+        video_id = MUSIC.fallback(mood, age_group, language, st.session_state.music_shown)
     except HttpError as e:
         st.warning("YouTube API request failed. Using fallback video.")
         # Use fallback video on API error
-        fallback_id = get_fallback_video(mood, age_group)
-        if fallback_id:
-            return {'id': fallback_id}
-        return None
+        video_id = MUSIC.fallback(mood, age_group, language, st.session_state.music_shown)
     except Exception as e:
         st.error(f"An error occurred: {e}")
         # Use fallback video on general error
-        fallback_id = get_fallback_video(mood, age_group)
-        if fallback_id:
-            return {'id': fallback_id}
-        return None
+        video_id = MUSIC.fallback(mood, age_group, language, st.session_state.music_shown)
+    return {'id': video_id} if video_id else None
 
 def main():
     st.set_page_config(
@@ -223,9 +111,10 @@ def main():
     
     # Add a reset button at the top
     if st.sidebar.button("Reset All Recommendations"):
-        st.session_state.music_topic_iterations = defaultdict(int)
-        st.session_state.music_current_topic = defaultdict(str)
-        st.session_state.get_new_recommendation = False
+        st.session_state.music_topics.clear()
+        st.session_state.music_shown.clear()
+    
+    MUSIC.warm()
     
     # Create a container for preferences
     with st.container():
@@ -235,49 +124,73 @@ def main():
             </div>
         """, unsafe_allow_html=True)
         
-        # Create three columns for preferences
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            # Mood selection
-            mood = st.selectbox(
-                "How are you feeling today?",
-                ["Happy", "Sad", "Energetic", "Relaxed", "Stressed", "Bored", "Adventurous"]
-            )
-        
-        with col2:
-            # Age selection with slider
-            age = st.slider(
-                "Select your age",
-                min_value=1,
-                max_value=100,
-                value=18,
-                step=1
-            )
-            
-            # Display age group based on age
-            age_group = get_age_group(age)
-            st.info(f"Age Group: {age_group.title()}")
-        
-        with col3:
-            # Language selection
-            language = st.selectbox(
-                "Select your preferred language",
-                ["English", "Hindi", "Tamil", "Telugu", "Kannada", "Malayalam"]
-            )
-        
-        # Center the recommendation button
-        col1, col2, col3 = st.columns([1, 2, 1])
-        with col2:
-            if st.button("Get Music Recommendation", use_container_width=True):
-                st.session_state.get_new_recommendation = True
+        preferences()
+        recommendation()
+
+    trending_section()
+    progress.save_session(st.session_state)
+    tracing.debug_sidebar(st.session_state)
+
+@st.fragment
+def preferences():
+    """
+    Preference controls. Changing one only reruns this fragment; the
+    values are read from session state by the recommendation fragment.
+    """
+    # Create three columns for preferences
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        # Mood selection
+        st.selectbox(
+            "How are you feeling today?",
+            MOODS,
+            key="music_mood"
+        )
+    
+    with col2:
+        # Age selection with slider
+        age = st.slider(
+            "Select your age",
+            min_value=1,
+            max_value=100,
+            value=18,
+            step=1,
+            key="music_age"
+        )
+        
+        # Display age group based on age
+        st.info(f"Age Group: {get_age_group(age).title()}")
+    
+    with col3:
+        # Language selection
+        st.selectbox(
+            "Select your preferred language",
+            LANGUAGES,
+            key="music_language"
+        )
+
+@st.fragment
+def recommendation():
+    """
+    The recommendation button and its music video, rerun on their own when the
+    button is clicked
+    """
+    # Center the recommendation button
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
+        clicked = st.button("Get Music Recommendation", use_container_width=True)
     
-    # Initialize session state for new recommendation
-    if 'get_new_recommendation' not in st.session_state:
-        st.session_state.get_new_recommendation = False
+    if not clicked:
+        st.info("👆 Click 'Get Music Recommendation' above to start!")
+        return
     
     # Get and display recommendation
-    if st.session_state.get_new_recommendation:
+    mood = st.session_state.music_mood
+    age_group = get_age_group(st.session_state.music_age)
+    language = st.session_state.music_language
+    # A click on its own is a fragment run; trace it as one
+    with tracing.trace("music recommendation", session=st.session_state):
         video = get_music_recommendation(mood, age_group, language)
         if video:
             # Center the video content
@@ -291,11 +204,47 @@ def main():
                 st.video(f"https://www.youtube.com/watch?v={video['id']}")
         else:
             st.warning("No music found. Please try different preferences.")
-        
-        # Reset the flag
-        st.session_state.get_new_recommendation = False
-    else:
-        st.info("👆 Click 'Get Music Recommendation' above to start!")
+        progress.save_session(st.session_state)
+
+@st.fragment
+def trending_section():
+    """
+    What is trending on YouTube in a region, from the cached
+    mostPopular chart (refreshed in the background)
+    """
+    st.markdown("""
+        <div class='video-container'>
+            <h2 style='color: #FF4B4B;'>🎶 Trending Music</h2>
+        </div>
+    """, unsafe_allow_html=True)
+    
+    language = st.session_state.get("music_language", "English")
+    regions = list(trending.REGION_NAMES)
+    region = st.selectbox(
+        "Trending in",
+        regions,
+        index=regions.index(trending.REGIONS.get(language, "US")),
+        format_func=trending.REGION_NAMES.get,
+        key="music_trending_region"
+    )
+    
+    try:
+        with deadline.budget():
+            records = trending.trending("music", region)
+    except Exception:
+        st.info("Trending music is unavailable right now. Please try again later.")
+        return
+    if not records:
+        st.info("Nothing is trending here right now.")
+        return
+    
+    # Thumbnails link to YouTube instead of embedding a player per video
+    cols = st.columns(3)
+    for idx, record in enumerate(records):
+        with cols[idx % 3]:
+            st.image(f"https://i.ytimg.com/vi/{record.video_id}/mqdefault.jpg", use_container_width=True)
+            st.markdown(f"[{record.title}](https://www.youtube.com/watch?v={record.video_id})")
 
 if __name__ == "__main__":
-    main() 
+    with tracing.trace("YouTube Music", session=st.session_state):
+        main()
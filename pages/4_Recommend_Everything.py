@@ -0,0 +1,179 @@
+import streamlit as st
+from retro import deadline, progress, tracing
+from retro.bundle import BundleState, recommend_all
+from retro.movies import TMDB_IMAGE_BASE_URL
+from retro.state import BoundedSet, MAX_SHOWN_MOVIES, MAX_SHOWN_VIDEOS, TopicTracker
+from retro.videos import LANGUAGES, MOODS, MUSIC, VIDEOS, get_age_group
+
+# Bring back this client's progress after a refresh or reconnect
+progress.restore_session(st.session_state, st.query_params)
+
+# Share topics and shown items with the single-medium pages, so the bundle
+# doesn't repeat what they already showed
+if 'video_topics' not in st.session_state:
+    st.session_state.video_topics = TopicTracker()
+if 'video_shown' not in st.session_state:
+    st.session_state.video_shown = BoundedSet(MAX_SHOWN_VIDEOS)
+if 'music_topics' not in st.session_state:
+    st.session_state.music_topics = TopicTracker()
+if 'music_shown' not in st.session_state:
+    st.session_state.music_shown = BoundedSet(MAX_SHOWN_VIDEOS)
+if 'shown_movies' not in st.session_state:
+    st.session_state.shown_movies = BoundedSet(MAX_SHOWN_MOVIES)
+if 'current_page' not in st.session_state:
+    st.session_state.current_page = 1
+
+TITLES = {
+    "video": "📺 Video",
+    "music": "🎵 Music",
+    "movie": "🎬 Movie",
+}
+
+def display_video(video_id):
+    if video_id:
+        st.video(f"https://www.youtube.com/watch?v={video_id}")
+    else:
+        st.warning("No videos found. Please try different preferences.")
+
+def display_movie(movie):
+    if movie is None:
+        st.warning("No new movies found. Try different preferences.")
+        return
+    if movie.poster_path:
+        st.image(f"{TMDB_IMAGE_BASE_URL}{movie.poster_path}", use_container_width=True)
+    st.subheader(movie.title)
+    if movie.omdb and movie.omdb.imdb_rating != 'N/A':
+        st.write(f"**IMDb:** ⭐ {movie.omdb.imdb_rating}/10")
+    else:
+        st.write(f"**TMDB:** ⭐ {movie.vote_average}/10")
+    if movie.genre_names:
+        st.write(", ".join(movie.genre_names))
+    st.write(movie.overview)
+
+def display_result(medium, result, error, mood, age_group, language):
+    """Render one medium's result as soon as it arrives"""
+    st.markdown(f"<h3 style='color: #FF4B4B;'>{TITLES[medium]}</h3>", unsafe_allow_html=True)
+    if medium == "movie":
+        if error:
+            st.error(f"Movie recommendations are unavailable right now: {error}")
+        else:
+            movie, _ = result
+            display_movie(movie)
+        return
+    if error:
+        if isinstance(error, deadline.DeadlineExceeded):
+            st.warning("YouTube didn't answer in time. Using fallback video.")
+        else:
+            st.warning("YouTube API request failed. Using fallback video.")
+        if medium == "video":
+            result = VIDEOS.fallback(mood, age_group, language, st.session_state.video_shown)
+        else:
+            result = MUSIC.fallback(mood, age_group, language, st.session_state.music_shown)
+    display_video(result)
+
+def main():
+    st.set_page_config(
+        page_title="Recommend Everything",
+        page_icon="🎮",
+        layout="wide"
+    )
+
+    # Custom CSS
+    st.markdown("""
+        <style>
+        .stButton>button {
+            width: 100%;
+            border-radius: 5px;
+            height: 3em;
+            margin-top: 1em;
+            background-color: #FF4B4B;
+            color: white;
+            border: none;
+        }
+        .stButton>button:hover {
+            background-color: #FF6B6B;
+        }
+        .preference-card {
+            background-color: #262730;
+            padding: 1.5em;
+            border-radius: 10px;
+            margin: 1em 0;
+            box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
+        }
+        </style>
+    """, unsafe_allow_html=True)
+
+    # Title
+    st.markdown("""
+        <h1 style='text-align: center; color: #FF4B4B;'>🎮 Recommend Everything</h1>
+        <p style='text-align: center; color: #FAFAFA;'>A video, a song and a movie for how you feel, all at once.</p>
+    """, unsafe_allow_html=True)
+
+    with st.container():
+        st.markdown("""
+            <div class='preference-card'>
+                <h2 style='color: #FF4B4B;'>Your Preferences</h2>
+            </div>
+        """, unsafe_allow_html=True)
+
+        preferences()
+        recommendations()
+
+    progress.save_session(st.session_state)
+    tracing.debug_sidebar(st.session_state)
+
+@st.fragment
+def preferences():
+    """Preference controls; changing one only reruns this fragment"""
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.selectbox("How are you feeling today?", MOODS, key="bundle_mood")
+    with col2:
+        age = st.slider("Select your age", min_value=1, max_value=100, value=18, step=1, key="bundle_age")
+        st.info(f"Age Group: {get_age_group(age).title()}")
+    with col3:
+        st.selectbox("Select your preferred language", LANGUAGES, key="bundle_language")
+
+@st.fragment
+def recommendations():
+    """The button and the three results, rerun on their own when it is clicked"""
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
+        clicked = st.button("Get Recommendations", use_container_width=True)
+
+    if not clicked:
+        st.info("👆 Click 'Get Recommendations' above to start!")
+        return
+
+    mood = st.session_state.bundle_mood
+    age = st.session_state.bundle_age
+    language = st.session_state.bundle_language
+    age_group = get_age_group(age)
+
+    # Worker threads get plain objects, never st.session_state itself
+    state = BundleState(
+        st.session_state.video_topics,
+        st.session_state.video_shown,
+        st.session_state.music_topics,
+        st.session_state.music_shown,
+        st.session_state.shown_movies,
+        st.session_state.current_page,
+    )
+    columns = dict(zip(TITLES, st.columns(3)))
+    placeholders = {medium: column.empty() for medium, column in columns.items()}
+    for medium, placeholder in placeholders.items():
+        placeholder.info(f"Finding your {medium}...")
+
+    # One deadline for the whole bundle; slow mediums fall back instead of waiting
+    with tracing.trace("bundle recommendation", session=st.session_state), deadline.budget():
+        for medium, result, error in recommend_all(mood, age, language, state):
+            if medium == "movie" and not error:
+                # The next bundle resumes from where this one found its movie
+                st.session_state.current_page = result[1]
+            with placeholders[medium].container():
+                display_result(medium, result, error, mood, age_group, language)
+    progress.save_session(st.session_state)
+
+if __name__ == "__main__":
+    with tracing.trace("Recommend Everything", session=st.session_state):
+        main()
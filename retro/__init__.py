@@ -0,0 +1,3 @@
+"""
+Shared building blocks for the R.E.T.R.O. pages
+"""
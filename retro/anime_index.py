@@ -0,0 +1,159 @@
+"""
+Local index of seasonal and genre anime listings.
+
+``scripts/build_anime_index.py`` pulls seasonal lists and per-genre
+listings from Jikan offline and writes them here as compact records, each
+with a bitmask of its MAL genre IDs. The anime page then answers
+multi-genre, SFW and rating filters and season picks locally, without a
+network round-trip.
+"""
+import json
+import os
+import time
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from retro.catalogs import ROOT_DIR
+
+INDEX_VERSION = 1
+DEFAULT_INDEX_PATH = os.path.join(ROOT_DIR, "anime_index.json")
+
+# Jikan rating strings -> the rating codes used by its search filter
+RATING_CODES = {
+    "G - All Ages": "g",
+    "PG - Children": "pg",
+    "PG-13 - Teens 13 or older": "pg13",
+    "R - 17+ (violence & profanity)": "r17",
+    "R+ - Mild Nudity": "r",
+    "Rx - Hentai": "rx",
+}
+# Genres Jikan's sfw flag filters out (Hentai, Erotica)
+NSFW_GENRES = (12, 49)
+
+
+class AnimeRecord(NamedTuple):
+    """The fields the anime card renders, plus the genre bitmask"""
+    mal_id: int
+    title: str
+    image_url: Optional[str]
+    score: Optional[float]
+    rating: Optional[str]
+    rank: Optional[int]
+    genre_mask: int
+    genre_names: str
+    status: Optional[str]
+    type: Optional[str]
+    studios: str
+    episodes: Optional[int]
+    duration: Optional[str]
+    source: Optional[str]
+    popularity: Optional[int]
+    members: Optional[int]
+    favorites: Optional[int]
+    synopsis: Optional[str]
+
+
+def genre_mask(genre_ids: Iterable[int]) -> int:
+    """Bitmask with one bit per MAL genre ID"""
+    mask = 0
+    for genre_id in genre_ids:
+        mask |= 1 << int(genre_id)
+    return mask
+
+
+NSFW_MASK = genre_mask(NSFW_GENRES)
+
+
+def compact(anime: Dict) -> AnimeRecord:
+    """Build a compact record from a Jikan anime object"""
+    genres = anime.get('genres', []) + anime.get('explicit_genres', []) + anime.get('themes', [])
+    return AnimeRecord(
+        mal_id=anime['mal_id'],
+        title=anime.get('title', 'No title'),
+        image_url=anime.get('images', {}).get('jpg', {}).get('large_image_url'),
+        score=anime.get('score'),
+        rating=RATING_CODES.get(anime.get('rating'), anime.get('rating')),
+        rank=anime.get('rank'),
+        genre_mask=genre_mask(g['mal_id'] for g in genres),
+        genre_names=", ".join(g['name'] for g in anime.get('genres', [])),
+        status=anime.get('status'),
+        type=anime.get('type'),
+        studios=", ".join(s['name'] for s in anime.get('studios', [])),
+        episodes=anime.get('episodes'),
+        duration=anime.get('duration'),
+        source=anime.get('source'),
+        popularity=anime.get('popularity'),
+        members=anime.get('members'),
+        favorites=anime.get('favorites'),
+        synopsis=anime.get('synopsis')
+    )
+
+
+def to_card(record: AnimeRecord) -> Dict:
+    """Expand a record into the dict shape ``display_anime_card`` expects"""
+    card = record._asdict()
+    card['images'] = {'jpg': {'large_image_url': record.image_url}}
+    card['genres'] = [{'name': name} for name in record.genre_names.split(", ") if name]
+    card['studios'] = [{'name': name} for name in record.studios.split(", ") if name]
+    return card
+
+
+class AnimeIndex:
+    """Records plus season -> record positions, answered in memory"""
+
+    def __init__(self, records: List[AnimeRecord], seasons: Dict[str, List[int]], built_at=None):
+        self.records = records
+        self.seasons = seasons
+        self.built_at = built_at
+
+    def filter(self, genre_ids=(), rating=None, sfw=True, limit=20) -> List[AnimeRecord]:
+        """Anime having all ``genre_ids`` and the given rating, most popular first"""
+        wanted = genre_mask(genre_ids)
+        matches = [
+            r for r in self.records
+            if r.genre_mask & wanted == wanted
+            and (rating is None or r.rating == rating)
+            and not (sfw and (r.rating == "rx" or r.genre_mask & NSFW_MASK))
+        ]
+        matches.sort(key=lambda r: -(r.members or 0))
+        return matches[:limit]
+
+    def season(self, year, season) -> Optional[List[AnimeRecord]]:
+        """Anime of a season, or None if the season was not ingested"""
+        positions = self.seasons.get(season_key(year, season))
+        if positions is None:
+            return None
+        return [self.records[i] for i in positions]
+
+
+def season_key(year, season):
+    return f"{int(year)}-{season}"
+
+
+def save_index(records: Iterable[AnimeRecord], seasons: Dict[str, List[int]],
+               path=DEFAULT_INDEX_PATH):
+    """Write records (as positional rows) and the season map to ``path``"""
+    payload = {
+        "version": INDEX_VERSION,
+        "built_at": time.time(),
+        "fields": list(AnimeRecord._fields),
+        "records": [list(r) for r in records],
+        "seasons": seasons,
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+@lru_cache(maxsize=None)
+def load_index(path=DEFAULT_INDEX_PATH) -> Optional[AnimeIndex]:
+    """Load the index once per process; None when it has not been built"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        payload = json.load(f)
+    if payload.get("version") != INDEX_VERSION or payload.get("fields") != list(AnimeRecord._fields):
+        return None
+    records = [AnimeRecord(*row) for row in payload["records"]]
+    return AnimeIndex(records, payload["seasons"], payload.get("built_at"))
@@ -0,0 +1,258 @@
+"""
+Headless JSON API over the recommendation logic of the pages.
+
+A plain ASGI application (no framework dependency) sharing the process's
+caches, rate limits, ready queues and API clients with the UI. Serve it
+with any ASGI server, e.g. ``uvicorn retro.api:app --workers 4``.
+
+    GET /health
+    GET /recommend?mood=Happy&age=18&language=English     all mediums
+    GET /recommend/<video|music|movie>?mood=...&age=...&language=...
+
+An optional ``client`` parameter names the caller's state: requests with
+the same ``client`` get no repeats, like a UI session. Every request runs
+under the ``request_budget`` deadline (``retro.deadline``).
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from retro import bundle, deadline, progress, tracing
+from retro.bundle import BundleState
+from retro.movies import TMDB_IMAGE_BASE_URL
+from retro.state import MAX_SHOWN_MOVIES, MAX_SHOWN_VIDEOS, BoundedSet, TopicTracker
+from retro.videos import LANGUAGES, MOODS, MUSIC, VIDEOS, get_age_group
+
+logger = logging.getLogger(__name__)
+
+# Client states kept for the ``client`` parameter
+MAX_CLIENTS = 10000
+# Threads running the (blocking) recommenders
+API_WORKERS = 32
+
+_executor = ThreadPoolExecutor(max_workers=API_WORKERS, thread_name_prefix="api")
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ClientStates:
+    """Bounded LRU of ``BundleState`` by client ID, with a lock per client"""
+
+    def __init__(self, max_clients=MAX_CLIENTS):
+        self.max_clients = max_clients
+        self._states = OrderedDict()
+        self._client_locks = {}
+        self._lock = threading.Lock()
+
+    def lock(self, client_id):
+        """The lock serializing requests of one client (a no-op without a client ID)"""
+        if not client_id:
+            return nullcontext()
+        with self._lock:
+            return self._client_locks.setdefault(client_id, threading.Lock())
+
+    def get(self, client_id):
+        if not client_id:
+            return new_state()
+        with self._lock:
+            state = self._states.get(client_id)
+            if state is not None:
+                self._states.move_to_end(client_id)
+                return state
+        # A client seen by an earlier process (or a page) picks up where it
+        # was; loaded outside the lock so other clients don't wait on SQLite
+        loaded = new_state(progress.load(client_id))
+        with self._lock:
+            state = self._states.setdefault(client_id, loaded)
+            self._states.move_to_end(client_id)
+            while len(self._states) > self.max_clients:
+                evicted, _ = self._states.popitem(last=False)
+                self._client_locks.pop(evicted, None)
+            return state
+
+    def put(self, client_id, state):
+        """Replace a client's state (``BundleState`` is immutable)"""
+        if not client_id:
+            return
+        with self._lock:
+            self._states[client_id] = state
+            self._states.move_to_end(client_id)
+
+
+def new_state(saved=None):
+    """A fresh client state, or one rebuilt from saved ``retro.progress``"""
+    if saved is None:
+        return BundleState(
+            TopicTracker(), BoundedSet(MAX_SHOWN_VIDEOS), TopicTracker(), BoundedSet(MAX_SHOWN_VIDEOS),
+            BoundedSet(MAX_SHOWN_MOVIES)
+        )
+    values = progress.build(saved)
+    return BundleState(
+        values["video_topics"], values["video_shown"], values["music_topics"], values["music_shown"],
+        values["shown_movies"], values["current_page"]
+    )
+
+
+_clients = ClientStates()
+
+
+def parse_preferences(query):
+    """Validated ``(mood, age, language, client)`` from a query string"""
+    params = {key: values[-1] for key, values in parse_qs(query).items()}
+    mood = params.get("mood", "")
+    if mood not in MOODS:
+        raise ApiError(400, f"mood must be one of {', '.join(MOODS)}")
+    language = params.get("language", "English")
+    if language not in LANGUAGES:
+        raise ApiError(400, f"language must be one of {', '.join(LANGUAGES)}")
+    try:
+        age = int(params.get("age", "18"))
+    except ValueError:
+        raise ApiError(400, "age must be an integer") from None
+    if not 1 <= age <= 100:
+        raise ApiError(400, "age must be between 1 and 100")
+    return mood, age, language, params.get("client")
+
+
+def video_json(video_id, fallback=False):
+    if not video_id:
+        return None
+    return {
+        "video_id": video_id,
+        "url": f"https://www.youtube.com/watch?v={video_id}",
+        "fallback": fallback,
+    }
+
+
+def movie_json(movie):
+    if movie is None:
+        return None
+    data = movie._asdict()
+    data["omdb"] = movie.omdb._asdict() if movie.omdb else None
+    data["poster_url"] = f"{TMDB_IMAGE_BASE_URL}{movie.poster_path}" if movie.poster_path else None
+    return data
+
+
+def result_json(medium, result, error, mood, age, language, state):
+    """JSON for one medium; videos degrade to the catalog fallback like the pages"""
+    if medium == "movie":
+        if error:
+            return {"error": "Movie recommendations are unavailable"}
+        movie, _ = result
+        return movie_json(movie)
+    if error:
+        logger.warning("%s recommendation failed, using fallback: %s", medium, error)
+        if medium == "video":
+            video_id = VIDEOS.fallback(mood, get_age_group(age), language, state.video_shown)
+        else:
+            video_id = MUSIC.fallback(mood, get_age_group(age), language, state.music_shown)
+        return video_json(video_id, fallback=True)
+    return video_json(result)
+
+
+def recommend(medium, query):
+    """Blocking handler for ``/recommend`` and ``/recommend/<medium>``"""
+    mood, age, language, client_id = parse_preferences(query)
+    # Requests of one client take turns, so they don't race on its state
+    # (workers still running past the deadline only touch it through the
+    # locked ``retro.state`` collections)
+    with _clients.lock(client_id):
+        state = _clients.get(client_id)
+        with tracing.trace("api recommend", medium=medium or "all"), deadline.budget():
+            status, body, state = _recommend(medium, mood, age, language, state)
+        if client_id:
+            _clients.put(client_id, state)
+            progress.save(client_id, progress.dump(dict(state._asdict(), current_page=state.movie_page)))
+    return status, body
+
+
+def _advance(state, medium, result, error):
+    """``state`` moved on to the discover page a movie result resumes from"""
+    if medium == "movie" and not error:
+        return state._replace(movie_page=result[1])
+    return state
+
+
+def _recommend(medium, mood, age, language, state):
+    """``(status, body, state)``, the state advanced past this response"""
+    if medium is None:
+        body = {}
+        for name, result, error in bundle.recommend_all(mood, age, language, state):
+            body[name] = result_json(name, result, error, mood, age, language, state)
+            state = _advance(state, name, result, error)
+        return 200, body, state
+
+    # A single medium runs right here instead of on the bundle's pool
+    try:
+        result, error = bundle.RECOMMENDERS[medium](mood, age, language, state), None
+    except Exception as e:
+        result, error = None, e
+    body = result_json(medium, result, error, mood, age, language, state)
+    state = _advance(state, medium, result, error)
+    if body and "error" in body:
+        return 502, body, state
+    return 200, {medium: body}, state
+
+
+def route(method, path, query):
+    if method != "GET":
+        raise ApiError(405, "Only GET is supported")
+    if path == "/health":
+        return 200, {"status": "ok"}
+    if path == "/recommend":
+        return recommend(None, query)
+    if path.startswith("/recommend/"):
+        medium = path[len("/recommend/"):]
+        if medium not in bundle.MEDIUMS:
+            raise ApiError(404, f"Unknown medium: {medium}")
+        return recommend(medium, query)
+    raise ApiError(404, "Not found")
+
+
+async def _send_json(send, status, body):
+    payload = json.dumps(body, separators=(",", ":")).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(payload)).encode("ascii")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": payload})
+
+
+async def app(scope, receive, send):
+    """ASGI entry point"""
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+
+    query = scope.get("query_string", b"").decode("latin-1")
+    loop = asyncio.get_running_loop()
+    try:
+        status, body = await loop.run_in_executor(
+            _executor, route, scope["method"], scope["path"], query
+        )
+    except ApiError as e:
+        status, body = e.status, {"error": str(e)}
+    except Exception:
+        logger.exception("Unhandled error for %s", scope["path"])
+        status, body = 500, {"error": "Internal server error"}
+    await _send_json(send, status, body)
@@ -0,0 +1,96 @@
+"""
+"Recommend everything": a video, a song and a movie for one mood, age and
+language, fetched concurrently.
+
+Each medium runs on a worker thread, so the bundle takes as long as its
+slowest upstream rather than the sum of all three. Workers only touch the
+plain state objects handed to them in ``BundleState``, never Streamlit.
+"""
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed
+from typing import Any, Iterator, NamedTuple, Optional, Tuple
+
+from retro import deadline, movies, tracing
+from retro.state import BoundedSet, TopicTracker
+from retro.videos import MUSIC, VIDEOS, get_age_group
+
+MEDIUMS = ("video", "music", "movie")
+# Discover pages tried for an unseen movie before giving up
+MAX_MOVIE_PAGES = 3
+# Shared by every session (and the JSON API), three workers per bundle
+BUNDLE_WORKERS = 24
+
+_executor = ThreadPoolExecutor(max_workers=BUNDLE_WORKERS, thread_name_prefix="bundle")
+
+
+class BundleState(NamedTuple):
+    """The per-user state a bundle reads and updates"""
+    video_topics: TopicTracker
+    video_shown: BoundedSet
+    music_topics: TopicTracker
+    music_shown: BoundedSet
+    shown_movies: BoundedSet
+    movie_page: int = 1
+
+
+def recommend_video(mood, age, language, state):
+    return VIDEOS.recommend(mood, get_age_group(age), language, state.video_topics, state.video_shown)
+
+
+def recommend_music(mood, age, language, state):
+    return MUSIC.recommend(mood, get_age_group(age), language, state.music_topics, state.music_shown)
+
+
+def recommend_movie(mood, age, language, state):
+    """
+    The first unseen ``MovieCard`` for the mood's genre (or None) and the
+    discover page the next call should start from
+    """
+    genre_id = movies.MOOD_GENRES.get(mood, movies.GENRES["Comedy"])
+    page = state.movie_page
+    for _ in range(MAX_MOVIE_PAGES):
+        cards, total_pages = movies.discover(genre_id, age, language, page, state.shown_movies, limit=1)
+        if cards:
+            return cards[0], page
+        if page >= total_pages:
+            # Every page was seen; start over, older movies have left ``shown_movies``
+            return None, 1
+        page += 1
+    return None, page
+
+
+RECOMMENDERS = {
+    "video": recommend_video,
+    "music": recommend_music,
+    "movie": recommend_movie,
+}
+
+
+def _traced(medium, mood, age, language, state):
+    with tracing.span(medium):
+        return RECOMMENDERS[medium](mood, age, language, state)
+
+
+def recommend_all(mood, age, language, state: BundleState,
+                  mediums=MEDIUMS) -> Iterator[Tuple[str, Any, Optional[Exception]]]:
+    """
+    Start every medium at once and yield ``(medium, result, error)`` in
+    completion order. ``result`` is a video ID for video and music and a
+    ``(MovieCard, next_page)`` pair for movies; it is None when ``error``
+    is set. Workers run under the caller's deadline, and mediums still
+    missing when it passes are yielded with ``DeadlineExceeded``.
+    """
+    futures = {
+        _executor.submit(deadline.propagate(_traced), medium, mood, age, language, state): medium
+        for medium in mediums
+    }
+    pending = dict(futures)
+    left = deadline.remaining()
+    try:
+        for future in as_completed(futures, timeout=None if left is None else max(left, 0)):
+            medium = pending.pop(future)
+            error = future.exception()
+            yield medium, None if error else future.result(), error
+    except FuturesTimeout:
+        # Workers share the deadline and give up on their own shortly
+        for medium in pending.values():
+            yield medium, None, deadline.DeadlineExceeded(f"No {medium} before the deadline")
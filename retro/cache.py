@@ -0,0 +1,303 @@
+"""
+Process-wide response cache with stale-while-revalidate semantics.
+
+Every cached upstream response (YouTube search pools, TMDB discover pages
+and movie details, OMDB records) goes through ``Cache.get_or_fetch``:
+
+* fresh entries are returned immediately;
+* hot entries are re-fetched by a background refresher shortly before they
+  expire, so expiry never shows up as user-visible latency;
+* expired entries are still returned immediately while a refresh runs in
+  the background (stale-while-revalidate);
+* when the upstream fails, the last good value is served (stale-if-error).
+"""
+import json
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from retro import deadline, tracing
+from retro.cache_backends import get_backend
+
+logger = logging.getLogger(__name__)
+
+# How long past expiry an entry may still be served
+DEFAULT_MAX_STALE = 24 * 3600
+# Fraction of the TTL before expiry at which hot entries are refreshed
+REFRESH_AHEAD = 0.1
+# Wait before retrying a failed background refresh
+ERROR_BACKOFF = 60
+# How often the refresher scans for entries about to expire
+REFRESH_INTERVAL = 5
+REFRESH_WORKERS = 4
+
+
+class _Meta:
+    """What this process knows about an entry it has served"""
+    __slots__ = ('fetch', 'fetched_at', 'ttl', 'hits', 'refreshing', 'retry_at')
+
+    def __init__(self, fetch, fetched_at, ttl):
+        self.fetch = fetch
+        self.fetched_at = fetched_at
+        self.ttl = ttl
+        # Reads since the last refresh; only entries that were read are kept warm
+        self.hits = 0
+        self.refreshing = False
+        self.retry_at = 0.0
+
+
+class Cache:
+    """
+    A named cache of upstream responses.
+
+    Values live in the configured backend (see ``retro.cache_backends``)
+    so replicas sharing a backend share results; the fetch callables and
+    hit counts that drive background refresh stay in this process. With
+    ``keep_warm`` every entry is refreshed ahead of expiry, read or not.
+    """
+
+    def __init__(self, name, ttl, max_entries=1000, max_stale=DEFAULT_MAX_STALE, backend=None,
+                 keep_warm=False):
+        self.name = name
+        self.ttl = ttl
+        self.keep_warm = keep_warm
+        self.max_entries = max_entries
+        self.max_stale = max_stale
+        self._backend = backend
+        self._meta = OrderedDict()
+        self._lock = threading.Lock()
+        # Per-key locks so concurrent misses trigger a single fetch
+        self._key_locks = {}
+        _refresher.register(self)
+
+    @property
+    def backend(self):
+        return self._backend or get_backend()
+
+    def backend_key(self, key):
+        """Namespaced string form of ``key`` used by the backend"""
+        return f"{self.name}:{json.dumps(key, separators=(',', ':'), default=str)}"
+
+    def get_or_fetch(self, key, fetch, ttl=None):
+        """
+        Return the cached value for ``key``, calling ``fetch()`` on a miss.
+
+        ``fetch`` must not touch Streamlit APIs: it may also be run by the
+        background refresher.
+        """
+        with tracing.span("cache", cache=self.name) as span:
+            return self._get_or_fetch(key, fetch, self.ttl if ttl is None else ttl, span)
+
+    def _get_or_fetch(self, key, fetch, ttl, span):
+        bkey = self.backend_key(key)
+        stored = self._read(bkey)
+        if stored is not None:
+            value, fetched_at, stored_ttl = stored
+            meta = self._touch(bkey, fetch, fetched_at, stored_ttl)
+            age = time.time() - fetched_at
+            if age < stored_ttl:
+                span.set(hit="fresh")
+                return value
+            if age < stored_ttl + self.max_stale:
+                # Serve stale, revalidate in the background
+                self._schedule_refresh(bkey, meta)
+                span.set(hit="stale")
+                return value
+
+        lock = self._key_lock(bkey)
+        left = deadline.remaining()
+        # A background fetch may hold the key; don't wait past the deadline
+        if not lock.acquire(timeout=-1 if left is None else max(left, 0)):
+            if stored is not None:
+                span.set(hit="stale-on-deadline")
+                return stored[0]
+            span.set(hit="deadline")
+            raise deadline.DeadlineExceeded("Request deadline exceeded")
+        try:
+            # Another thread may have filled the entry while we waited
+            latest = self._read(bkey)
+            if latest is not None and time.time() - latest[1] < latest[2]:
+                span.set(hit="fresh")
+                return latest[0]
+            span.set(hit="miss")
+            try:
+                value = fetch()
+            except Exception:
+                if stored is not None:
+                    logger.warning("%s: serving stale value for %r after fetch error", self.name, key)
+                    span.set(hit="stale-if-error")
+                    return stored[0]
+                raise
+            self._write(bkey, value, ttl, fetch)
+            return value
+        finally:
+            lock.release()
+
+    def set(self, key, value, ttl=None, fetch=None):
+        """Store a value for ``key``"""
+        self._write(self.backend_key(key), value, self.ttl if ttl is None else ttl, fetch)
+
+    def peek(self, key):
+        """Return the cached value for ``key`` without fetching, or None"""
+        stored = self._read(self.backend_key(key))
+        return None if stored is None else stored[0]
+
+    def clear(self):
+        with self._lock:
+            self._meta.clear()
+        self.backend.clear(f"{self.name}:")
+
+    def __len__(self):
+        return len(self._meta)
+
+    def _read(self, bkey):
+        try:
+            return self.backend.get(bkey)
+        except Exception as e:
+            # A shared backend being down must not take the pages down
+            logger.warning("%s: cache backend read failed: %s", self.name, e)
+            return None
+
+    def _write(self, bkey, value, ttl, fetch):
+        fetched_at = time.time()
+        try:
+            self.backend.set(bkey, value, fetched_at, ttl, ttl + self.max_stale)
+        except Exception as e:
+            logger.warning("%s: cache backend write failed: %s", self.name, e)
+        if fetch is not None:
+            with self._lock:
+                meta = self._meta.get(bkey)
+                if meta is None:
+                    self._remember(bkey, _Meta(fetch, fetched_at, ttl))
+                else:
+                    meta.fetched_at = fetched_at
+                    meta.ttl = ttl
+
+    def _touch(self, bkey, fetch, fetched_at, ttl):
+        with self._lock:
+            meta = self._meta.get(bkey)
+            if meta is None:
+                meta = self._remember(bkey, _Meta(fetch, fetched_at, ttl))
+            else:
+                self._meta.move_to_end(bkey)
+                meta.fetch = fetch
+                meta.fetched_at = fetched_at
+                meta.ttl = ttl
+            meta.hits += 1
+            return meta
+
+    def _remember(self, bkey, meta):
+        # Caller holds self._lock
+        self._meta[bkey] = meta
+        while len(self._meta) > self.max_entries:
+            self._meta.popitem(last=False)
+        return meta
+
+    def _key_lock(self, bkey):
+        with self._lock:
+            lock = self._key_locks.get(bkey)
+            if lock is None:
+                if len(self._key_locks) > self.max_entries:
+                    self._key_locks.clear()
+                lock = self._key_locks[bkey] = threading.Lock()
+            return lock
+
+    def _schedule_refresh(self, bkey, meta):
+        with self._lock:
+            if meta.refreshing or time.time() < meta.retry_at:
+                return
+            meta.refreshing = True
+        _refresher.submit(self, bkey, meta)
+
+    def _refresh(self, bkey, meta):
+        try:
+            # Another replica may already have refreshed the shared entry
+            stored = self._read(bkey)
+            if stored is not None and time.time() - stored[1] < stored[2] * (1 - REFRESH_AHEAD):
+                with self._lock:
+                    meta.fetched_at, meta.ttl = stored[1], stored[2]
+                    meta.hits = 0
+                return
+            value = meta.fetch()
+        except Exception as e:
+            logger.warning("%s: background refresh of %s failed: %s", self.name, bkey, e)
+            with self._lock:
+                meta.retry_at = time.time() + ERROR_BACKOFF
+            return
+        finally:
+            with self._lock:
+                meta.refreshing = False
+        self._write(bkey, value, meta.ttl, meta.fetch)
+        with self._lock:
+            meta.hits = 0
+
+    def _due_for_refresh(self, now):
+        """Hot (or kept warm) entries that will expire within the refresh-ahead window"""
+        with self._lock:
+            due = []
+            expired = []
+            for bkey, meta in self._meta.items():
+                age = now - meta.fetched_at
+                if age >= meta.ttl + self.max_stale:
+                    expired.append(bkey)
+                elif ((meta.hits or self.keep_warm) and not meta.refreshing and now >= meta.retry_at
+                      and age >= meta.ttl * (1 - REFRESH_AHEAD)):
+                    meta.refreshing = True
+                    due.append((bkey, meta))
+            for bkey in expired:
+                del self._meta[bkey]
+            return due
+
+
+class _Refresher:
+    """Background thread that keeps hot entries of every cache warm"""
+
+    def __init__(self):
+        # Caches built outside ``get_cache`` are dropped with their last reference
+        self._caches = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._thread = None
+
+    def register(self, cache):
+        """Keep ``cache`` warm (every ``Cache`` registers itself when created)"""
+        with self._lock:
+            self._caches.add(cache)
+            if self._thread is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=REFRESH_WORKERS, thread_name_prefix="cache-refresh"
+                )
+                self._thread = threading.Thread(target=self._run, name="cache-refresher", daemon=True)
+                self._thread.start()
+
+    def submit(self, cache, bkey, meta):
+        self._executor.submit(cache._refresh, bkey, meta)
+
+    def _run(self):
+        while True:
+            time.sleep(REFRESH_INTERVAL)
+            now = time.time()
+            with self._lock:
+                caches = list(self._caches)
+            for cache in caches:
+                for bkey, meta in cache._due_for_refresh(now):
+                    self.submit(cache, bkey, meta)
+
+
+_refresher = _Refresher()
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name, ttl, **kwargs):
+    """Return the process-wide cache called ``name``, creating it on first use"""
+    cache = _caches.get(name)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(name)
+            if cache is None:
+                cache = _caches[name] = Cache(name, ttl, **kwargs)
+    return cache
@@ -0,0 +1,263 @@
+"""
+Storage backends for the response cache.
+
+* ``MemoryBackend``: in-process LRU (default, one copy per replica);
+* ``SQLiteBackend``: a local SQLite file, shared by processes on one host;
+* ``RedisBackend``: any server speaking the Redis protocol, shared by the
+  whole fleet.
+
+Backends store ``(value, fetched_at, ttl)`` records under string keys.
+``expire`` is how long the record may be kept at all (TTL plus the stale
+window); backends are free to drop records earlier.
+
+The backend is chosen with the ``cache_backend`` setting (``memory``,
+``sqlite`` or ``redis``), see ``get_backend``; a snapshot file can be
+layered underneath it (``retro.snapshot``).
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from retro.config import get_secret
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SQLITE_PATH = os.path.join(".cache", "retro_cache.sqlite3")
+DEFAULT_REDIS_PREFIX = "retro:"
+
+
+def _encode(value, fetched_at, ttl):
+    return json.dumps({"v": value, "t": fetched_at, "ttl": ttl}, separators=(",", ":"))
+
+
+def _decode(raw):
+    if isinstance(raw, bytes):
+        raw = raw.decode("utf-8")
+    record = json.loads(raw)
+    return record["v"], record["t"], record["ttl"]
+
+
+class CacheBackend:
+    """Interface implemented by every cache backend"""
+
+    def get(self, key):
+        """Return ``(value, fetched_at, ttl)`` for ``key`` or None"""
+        raise NotImplementedError
+
+    def set(self, key, value, fetched_at, ttl, expire):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self, prefix=""):
+        """Drop every record whose key starts with ``prefix``"""
+        raise NotImplementedError
+
+    def items(self):
+        """Iterate over ``(key, (value, fetched_at, ttl))`` for live records"""
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """In-process LRU store"""
+
+    def __init__(self, max_entries=5000):
+        self.max_entries = max_entries
+        # key -> (value, fetched_at, ttl, expires_at)
+        self._records = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            record = self._records.get(key)
+            if record is None:
+                return None
+            if record[3] <= time.time():
+                del self._records[key]
+                return None
+            self._records.move_to_end(key)
+            return record[:3]
+
+    def set(self, key, value, fetched_at, ttl, expire):
+        with self._lock:
+            self._records[key] = (value, fetched_at, ttl, time.time() + expire)
+            self._records.move_to_end(key)
+            while len(self._records) > self.max_entries:
+                self._records.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._records.pop(key, None)
+
+    def clear(self, prefix=""):
+        with self._lock:
+            for key in [k for k in self._records if k.startswith(prefix)]:
+                del self._records[key]
+
+    def items(self):
+        now = time.time()
+        with self._lock:
+            records = list(self._records.items())
+        for key, record in records:
+            if record[3] > now:
+                yield key, record[:3]
+
+
+class SQLiteBackend(CacheBackend):
+    """Records in a local SQLite file (one connection per thread)"""
+
+    # Purge expired rows every this many writes
+    PURGE_EVERY = 500
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._writes = 0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return None if row is None else _decode(row[0])
+
+    def set(self, key, value, fetched_at, ttl, expire):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, _encode(value, fetched_at, ttl), time.time() + expire)
+            )
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+
+    def delete(self, key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self, prefix=""):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+
+    def items(self):
+        rows = self._connect().execute(
+            "SELECT key, value FROM cache WHERE expires_at > ?", (time.time(),)
+        )
+        for key, raw in rows:
+            yield key, _decode(raw)
+
+
+class RedisBackend(CacheBackend):
+    """
+    Records in a networked key-value store speaking the Redis protocol.
+
+    ``client`` may be any object with the redis-py ``get``/``set``/
+    ``delete``/``scan_iter`` methods, e.g. a ``fakeredis.FakeRedis``
+    stand-in; otherwise one is created from ``url`` with redis-py.
+    """
+
+    def __init__(self, url=None, client=None, prefix=DEFAULT_REDIS_PREFIX):
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise ImportError("The redis cache backend requires the 'redis' package") from None
+            client = redis.Redis.from_url(url or "redis://localhost:6379/0")
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else _decode(raw)
+
+    def set(self, key, value, fetched_at, ttl, expire):
+        self.client.set(
+            self.prefix + key, _encode(value, fetched_at, ttl), px=max(1, int(expire * 1000))
+        )
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def clear(self, prefix=""):
+        keys = list(self.client.scan_iter(match=self._pattern(prefix)))
+        if keys:
+            self.client.delete(*keys)
+
+    def items(self):
+        for full_key in self.client.scan_iter(match=self._pattern("")):
+            raw = self.client.get(full_key)
+            if raw is None:
+                continue
+            if isinstance(full_key, bytes):
+                full_key = full_key.decode("utf-8")
+            yield full_key[len(self.prefix):], _decode(raw)
+
+    def _pattern(self, prefix):
+        # Escape glob characters so the prefix matches literally
+        literal = "".join("\\" + c if c in "*?[]\\" else c for c in self.prefix + prefix)
+        return literal + "*"
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(kind=None):
+    """Build the backend named by ``kind`` or the ``cache_backend`` setting"""
+    kind = (kind or get_secret("cache_backend") or "memory").lower()
+    if kind == "memory":
+        return MemoryBackend()
+    if kind == "sqlite":
+        return SQLiteBackend(get_secret("cache_path") or DEFAULT_SQLITE_PATH)
+    if kind == "redis":
+        return RedisBackend(get_secret("redis_url"))
+    raise ValueError(f"Unknown cache backend: {kind}")
+
+
+def get_backend():
+    """
+    Return the process-wide cache backend, layered over the snapshot file
+    named by the ``cache_snapshot`` setting if there is one
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                backend = create_backend()
+                snapshot_path = get_secret("cache_snapshot")
+                if snapshot_path:
+                    from retro.snapshot import Snapshot, SnapshotBackend
+                    try:
+                        backend = SnapshotBackend(backend, Snapshot(snapshot_path))
+                    except (OSError, ValueError) as e:
+                        logger.warning("Not using cache snapshot %s: %s", snapshot_path, e)
+                _backend = backend
+    return _backend
+
+
+def set_backend(backend):
+    """Replace the process-wide cache backend (e.g. with a test stand-in)"""
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -0,0 +1,17 @@
+"""
+Query and fallback catalogs shipped as JSON next to ``Home.py``.
+
+Catalogs are parsed once per process instead of on every script rerun.
+"""
+import json
+import os
+from functools import lru_cache
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@lru_cache(maxsize=None)
+def load_catalog(filename):
+    """Load a JSON catalog from the project root"""
+    with open(os.path.join(ROOT_DIR, filename), 'r', encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,34 @@
+"""
+Secrets and settings lookup.
+
+Values come from Streamlit secrets when they are configured, otherwise
+from the environment (``.env`` is only read the first time a value is
+missing from secrets, so pages that never need it never import dotenv).
+"""
+import os
+
+_env_loaded = False
+
+
+def _load_env():
+    global _env_loaded
+    if not _env_loaded:
+        _env_loaded = True
+        try:
+            from dotenv import load_dotenv
+            load_dotenv()
+        except ImportError:
+            pass
+
+
+def get_secret(name, default=None):
+    """Look up ``name`` in Streamlit secrets, then in the environment"""
+    try:
+        import streamlit as st
+        if name in st.secrets:
+            return st.secrets[name]
+    except Exception:
+        # No secrets.toml, or running outside Streamlit
+        pass
+    _load_env()
+    return os.environ.get(name.upper(), default)
@@ -0,0 +1,74 @@
+"""
+Request deadlines propagated to every upstream call.
+
+A recommendation click (or API request) runs inside ``with budget():``,
+which sets an absolute deadline in a context variable. ``retro.http`` and
+``retro.youtube`` cut their socket timeouts and rate-limiter waits down to
+the time left, and optional enrichments (OMDb records, alternative titles,
+streaming providers) are skipped with ``has_time`` when they would miss
+it. Worst-case click latency is then bounded by the budget rather than
+by the sum of every call's own timeout.
+
+Context variables don't flow into thread pools by themselves: code fanning
+out work wraps it with ``propagate``. Background refreshes run without a
+deadline on purpose.
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+
+from retro.config import get_secret
+
+# Default budget of one recommendation request, in seconds
+DEFAULT_BUDGET = 1.5
+
+_deadline = contextvars.ContextVar("retro_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a call is started with no time left"""
+
+
+def default_budget():
+    return float(get_secret("request_budget") or DEFAULT_BUDGET)
+
+
+@contextmanager
+def budget(seconds=None):
+    """Run the block with a deadline ``seconds`` from now (never extending an outer one)"""
+    seconds = default_budget() if seconds is None else seconds
+    deadline = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """Seconds left before the current deadline, or None without one"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def has_time(seconds):
+    """Whether a step needing ``seconds`` can still finish in time"""
+    left = remaining()
+    return left is None or left >= seconds
+
+
+def timeout(default):
+    """``default`` capped to the time left; raises once the deadline has passed"""
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+    return left if default is None else min(default, left)
+
+
+def propagate(fn):
+    """Wrap ``fn`` to run in a copy of the caller's context (deadline included)"""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
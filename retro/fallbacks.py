@@ -0,0 +1,115 @@
+"""
+Self-growing pools of fallback videos.
+
+The catalog fallbacks (``video_fallback_videos.json``,
+``music_fallback_videos.json``) hold one video per mood and age group.
+Every video the recommenders serve successfully is also added to a
+bounded pool for its mood/age/language combo, persisted to a local JSON
+file, so when YouTube is unreachable or out of quota users get a rotation
+of known-good videos instead of the same clip on every click.
+"""
+import atexit
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from retro.catalogs import load_catalog
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIR = ".cache"
+# Videos kept per mood/age/language combo, oldest dropped first
+MAX_PER_COMBO = 50
+# Minimum seconds between writes of the pool file
+SAVE_INTERVAL = 30
+
+
+class FallbackPool:
+    """Known-good video IDs per combo, seeded from a fallback catalog"""
+
+    def __init__(self, name, seed_file, path=None, max_per_combo=MAX_PER_COMBO):
+        self.seed_file = seed_file
+        self.path = path or os.path.join(DEFAULT_DIR, f"fallback_{name}.json")
+        self.max_per_combo = max_per_combo
+        self._pools = None
+        self._dirty = False
+        self._saved_at = 0.0
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def _load(self):
+        # Caller holds self._lock
+        if self._pools is None:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self._pools = json.load(f)
+            except FileNotFoundError:
+                self._pools = {}
+            except (OSError, ValueError) as e:
+                logger.warning("Ignoring unreadable fallback pool %s: %s", self.path, e)
+                self._pools = {}
+        return self._pools
+
+    def add(self, mood, age_group, language, video_id):
+        """Remember a video that was served successfully"""
+        combo_key = f"{mood}-{age_group}-{language}"
+        with self._lock:
+            pool = self._load().setdefault(combo_key, [])
+            if video_id in pool:
+                pool.remove(video_id)
+            pool.append(video_id)
+            del pool[:-self.max_per_combo]
+            self._dirty = True
+            due = time.time() - self._saved_at >= SAVE_INTERVAL
+        if due:
+            self.flush()
+
+    def candidates(self, mood, age_group, language):
+        """
+        Fallback videos for the combo in order of preference: its own pool,
+        the same mood and age group in other languages, the catalog fallback
+        """
+        prefix = f"{mood}-{age_group}-"
+        with self._lock:
+            pools = self._load()
+            own = list(pools.get(prefix + language, []))
+            others = [video_id for key, pool in pools.items()
+                      if key.startswith(prefix) and key != prefix + language
+                      for video_id in pool]
+        seed = load_catalog(self.seed_file).get(mood, {}).get(age_group)
+        return [own, others, [seed] if seed else []]
+
+    def pick(self, mood, age_group, language="English", shown=()):
+        """
+        A random fallback video from the most preferred group that still
+        has one not in ``shown``, or None
+        """
+        tiers = self.candidates(mood, age_group, language)
+        for tier in tiers:
+            unseen = [video_id for video_id in tier if video_id not in shown]
+            if unseen:
+                return random.choice(unseen)
+        everything = [video_id for tier in tiers for video_id in tier]
+        return random.choice(everything) if everything else None
+
+    def flush(self):
+        """Write the pool file if it changed"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self._pools, separators=(",", ":"))
+            self._dirty = False
+            self._saved_at = time.time()
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning("Could not save fallback pool %s: %s", self.path, e)
@@ -0,0 +1,68 @@
+"""
+Field masks: ask each upstream for (or keep) only what the app reads.
+
+* YouTube supports partial responses natively; ``YOUTUBE_*_FIELDS`` are
+  passed as the ``fields`` parameter.
+* TMDB and OMDb always send whole records, so their responses are cut
+  down with ``select`` before they are cached (``retro.http.cached_json``
+  takes a ``fields`` mask). OMDb is asked for the short plot until a card
+  is actually displayed.
+
+Masks are nested dicts of field name to sub-mask; a list is shorthand for
+keeping whole fields, and ``True`` keeps a value as is. Lists in the data
+are masked item by item.
+"""
+import hashlib
+import json
+
+# YouTube partial-response masks
+YOUTUBE_SEARCH_FIELDS = "items(id/videoId,snippet(title,description))"
+YOUTUBE_STATUS_FIELDS = "items(id,status(embeddable,privacyStatus))"
+YOUTUBE_CHART_FIELDS = "items(id,snippet(title,description),status(embeddable,privacyStatus))"
+YOUTUBE_PLAYLIST_FIELDS = "nextPageToken,items(snippet(title,description,resourceId/videoId),status/privacyStatus)"
+
+# TMDB records as read by retro.movies and the movie page
+TMDB_DISCOVER = {
+    "total_pages": True,
+    "results": [
+        "id", "title", "original_title", "poster_path", "vote_average", "vote_count",
+        "overview", "genre_ids", "original_language", "adult"
+    ],
+}
+TMDB_IMDB_ID = ["imdb_id"]
+TMDB_ALTERNATIVE_TITLES = {"titles": ["title", "iso_3166_1"]}
+TMDB_PROVIDERS = {
+    "results": {
+        "US": {
+            "flatrate": ["provider_name", "logo_path"],
+            "free": ["provider_name", "logo_path"],
+        },
+    },
+}
+TMDB_RELEASE_DATES = {"results": {"iso_3166_1": True, "release_dates": ["certification"]}}
+
+# OMDb fields of ``OmdbDetails``
+OMDB_DETAILS = [
+    "Response", "imdbID", "imdbRating", "imdbVotes", "Metascore", "Runtime", "Rated", "Awards",
+    "Director", "Actors", "Plot", "Year", "Country", "Language", "BoxOffice"
+]
+OMDB_PLOT = ["Response", "Plot"]
+
+
+def select(data, mask):
+    """Keep only the parts of ``data`` named by ``mask``"""
+    if mask is True:
+        return data
+    if isinstance(data, list):
+        return [select(item, mask) for item in data]
+    if not isinstance(data, dict):
+        return data
+    if isinstance(mask, (list, tuple)):
+        mask = dict.fromkeys(mask, True)
+    return {name: select(data[name], sub) for name, sub in mask.items() if name in data}
+
+
+def mask_id(mask):
+    """Short stable ID of a mask, for cache keys"""
+    encoded = json.dumps(mask, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()[:8]
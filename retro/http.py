@@ -0,0 +1,151 @@
+"""
+Shared HTTP access for the TMDB and OMDB pages.
+
+``requests`` is imported on first use and a single pooled session is
+reused for every call, so keep-alive connections survive script reruns.
+Every request is paced by the per-host limiter in ``retro.ratelimit``
+and bounded by the caller's deadline from ``retro.deadline``.
+"""
+import threading
+import time
+
+from retro import deadline, ratelimit, replay, tracing
+from retro.keys import KEY_ERROR_STATUSES
+
+# Query parameters carrying credentials, never used in cache keys
+SECRET_PARAMS = frozenset(('api_key', 'apikey', 'key'))
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Return the process-wide ``requests.Session``"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                _session = requests.Session()
+    return _session
+
+
+# Socket timeout of calls that don't set one
+DEFAULT_TIMEOUT = 10
+
+
+def _send(method, url, kwargs, bucket):
+    with tracing.span("http", method=method, endpoint=url.split("?", 1)[0]) as span:
+        if bucket is not None:
+            left = deadline.remaining()
+            bucket.acquire(None if left is None else min(bucket.max_wait, max(left, 0)))
+        # Never wait on the socket past the request's deadline
+        kwargs["timeout"] = deadline.timeout(kwargs.get("timeout", DEFAULT_TIMEOUT))
+        response = _exchange(method, url, kwargs)
+        span.set(status=response.status_code, bytes=len(response.content))
+        return response
+
+
+def _exchange(method, url, kwargs):
+    """Send a request, or capture or replay it (``retro.replay``)"""
+    upstream_mode = replay.mode()
+    if upstream_mode == "live":
+        return get_session().request(method, url, **kwargs)
+    canonical = replay.canonical_url(url, kwargs.get("params"))
+    if upstream_mode == "replay":
+        status, body = replay.replay("http", method, canonical)
+        return _replayed_response(url, status, body)
+    started = time.monotonic()
+    response = get_session().request(method, url, **kwargs)
+    replay.record("http", method, canonical, response.status_code, response.text, time.monotonic() - started)
+    return response
+
+
+def _replayed_response(url, status, body):
+    import requests
+    response = requests.Response()
+    response.status_code = status
+    response._content = body.encode("utf-8")
+    response.encoding = "utf-8"
+    response.url = url
+    return response
+
+
+def _request(method, url, kwargs):
+    keys = kwargs.pop("keys", None)
+    if replay.mode() == "replay":
+        # Archived responses need neither credentials nor rate-limiter tokens
+        return _send(method, url, kwargs, None)
+    bucket = ratelimit.get_bucket(ratelimit.host_of(url))
+    if keys is None:
+        response = _send(method, url, kwargs, bucket)
+        if response.status_code == 429:
+            # Upstream throttled us anyway: hold back every caller for this host
+            bucket.pause(_retry_after(response))
+        return response
+
+    # A throttled or refused key is taken out and the next one tried
+    for _ in range(max(len(keys), 1)):
+        key = keys.acquire()
+        response = _send(method, url, keys.authorize(key, kwargs), bucket)
+        keys.report(key, response.status_code)
+        if response.status_code not in KEY_ERROR_STATUSES:
+            break
+    return response
+
+
+def get(url, **kwargs):
+    """
+    Issue a GET request through the shared session, after taking a token
+    from the host's rate limiter. The timeout is capped by the current
+    deadline (``retro.deadline``). With ``keys`` (a ``retro.keys.KeyPool``)
+    the request carries the pool's next healthy key.
+    """
+    return _request("GET", url, kwargs)
+
+
+def post(url, **kwargs):
+    """Issue a POST request through the shared session, paced and capped like ``get``"""
+    return _request("POST", url, kwargs)
+
+
+def _retry_after(response, default=5.0):
+    try:
+        return float(response.headers.get("Retry-After", default))
+    except ValueError:
+        return default
+
+
+def get_json(url, **kwargs):
+    """GET ``url`` and decode its JSON body, raising on non-200 responses"""
+    response = get(url, **kwargs)
+    if response.status_code != 200:
+        response.raise_for_status()
+        raise IOError(f"Unexpected status {response.status_code} from {url}")
+    return response.json()
+
+
+def cached_json(cache_name, ttl, url, params=None, fields=None, **kwargs):
+    """
+    ``get_json`` through the named response cache.
+
+    The cache key is the URL plus query parameters; headers and
+    credential parameters are deliberately left out. With a ``fields``
+    mask (``retro.fields``) only the selected parts of the response are
+    cached and returned.
+    """
+    from retro.cache import get_cache
+    from retro.fields import mask_id, select
+
+    key = (url, tuple(sorted(
+        (name, value) for name, value in (params or {}).items()
+        if name not in SECRET_PARAMS
+    )))
+    if fields is not None:
+        key += (mask_id(fields),)
+
+    def fetch():
+        data = get_json(url, params=params, **kwargs)
+        return data if fields is None else select(data, fields)
+
+    return get_cache(cache_name, ttl).get_or_fetch(key, fetch, ttl)
@@ -0,0 +1,67 @@
+"""
+Cached access to the Jikan (MyAnimeList) REST API.
+
+Responses are cached per endpoint through ``retro.cache`` with lifetimes
+that match how often the data changes, and every call is paced by the
+Jikan rate limiter, so popular tabs are served from cache without
+tripping 429s.
+"""
+from retro import http
+
+JIKAN_BASE_URL = "https://api.jikan.moe/v4"
+
+# Cache lifetimes (seconds) per endpoint
+SEARCH_TTL = 6 * 60 * 60
+SEASON_TTL = 12 * 60 * 60
+TOP_TTL = 12 * 60 * 60
+DETAILS_TTL = 24 * 60 * 60
+
+
+def _get(path, ttl, params=None):
+    data = http.cached_json("jikan", ttl, f"{JIKAN_BASE_URL}{path}", params=params, timeout=10)
+    return data.get('data')
+
+
+def _get_page(path, ttl, params):
+    """Like ``_get`` but also says whether another page follows"""
+    data = http.cached_json("jikan", ttl, f"{JIKAN_BASE_URL}{path}", params=params, timeout=10)
+    return data.get('data') or [], data.get('pagination', {}).get('has_next_page', False)
+
+
+def iter_pages(path, ttl, params=None, max_pages=None):
+    """Yield the items of every page of a paginated endpoint"""
+    page = 1
+    while max_pages is None or page <= max_pages:
+        items, has_next = _get_page(path, ttl, dict(params or {}, page=page))
+        yield from items
+        if not has_next:
+            break
+        page += 1
+
+
+def search_anime(genre_ids=(), rating=None, page=1, limit=20, sfw=True):
+    """Search anime by genre IDs and content rating"""
+    params = {"page": page, "limit": limit}
+    if genre_ids:
+        params["genres"] = ",".join(str(g) for g in genre_ids)
+    if rating:
+        params["rating"] = rating
+    if sfw:
+        params["sfw"] = "true"
+    return _get("/anime", SEARCH_TTL, params) or []
+
+
+def seasonal_anime(year, season, page=1):
+    """Anime airing in a season (winter, spring, summer, fall) of a year"""
+    return _get(f"/seasons/{int(year)}/{season}", SEASON_TTL, {"page": page}) or []
+
+
+def top_anime(page=1):
+    """Top-ranked anime on MyAnimeList"""
+    return _get("/top/anime", TOP_TTL, {"page": page}) or []
+
+
+def anime_details(anime_id):
+    """Full record for one anime"""
+    return _get(f"/anime/{int(anime_id)}/full", DETAILS_TTL)
+
@@ -0,0 +1,178 @@
+"""
+Pools of upstream credentials with per-key quota accounting and health.
+
+Each upstream can be given several keys (``youtube_api_keys``,
+``tmdb_bearer_tokens``, ``omdb_api_keys``: a list in ``secrets.toml`` or a
+comma-separated environment variable, next to the single-key settings).
+Requests go to the healthy key with the most quota left today; a key that
+is throttled (429) or refused (401/403, e.g. quota exceeded or revoked)
+is taken out of rotation for a while and the request is retried with the
+next one, so a bad key only costs the one request.
+
+Quota counters are per process and reset at midnight UTC; YouTube's
+quota day ends at midnight Pacific time, so a key that really is out is
+refused again and kept out by its health state.
+"""
+import datetime
+import logging
+import threading
+import time
+
+from retro.config import get_secret
+
+logger = logging.getLogger(__name__)
+
+# How long a key stays out of rotation after each kind of refusal
+THROTTLED_COOLDOWN = 60
+REFUSED_COOLDOWN = 60 * 60
+KEY_ERROR_STATUSES = frozenset((401, 403, 429))
+
+
+class NoKeyAvailable(Exception):
+    """Raised when every key of a pool is out of quota or out of rotation"""
+
+
+class _KeyState:
+    __slots__ = ('used', 'day', 'down_until', 'failures', 'last_status')
+
+    def __init__(self):
+        self.used = 0
+        self.day = None
+        self.down_until = 0.0
+        self.failures = 0
+        self.last_status = None
+
+
+class KeyPool:
+    """
+    The keys of one upstream. ``param`` (query parameter) or ``header``
+    plus ``prefix`` say how ``authorize`` attaches a key to a request.
+    """
+
+    def __init__(self, name, keys, daily_quota=None, param=None, header=None, prefix=""):
+        self.name = name
+        self.keys = list(dict.fromkeys(key for key in keys if key))
+        self.daily_quota = daily_quota
+        self.param = param
+        self.header = header
+        self.prefix = prefix
+        self._states = {key: _KeyState() for key in self.keys}
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        return bool(self.keys)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _state(self, key, today):
+        # Caller holds self._lock
+        state = self._states[key]
+        if state.day != today:
+            state.day = today
+            state.used = 0
+        return state
+
+    def acquire(self, units=1):
+        """
+        Charge ``units`` of quota to the healthy key with the most left and
+        return it; raises ``NoKeyAvailable`` when there is none
+        """
+        now = time.time()
+        today = datetime.datetime.fromtimestamp(now, datetime.timezone.utc).date()
+        with self._lock:
+            best = None
+            for key in self.keys:
+                state = self._state(key, today)
+                if state.down_until > now:
+                    continue
+                if self.daily_quota is not None and state.used + units > self.daily_quota:
+                    continue
+                if best is None or state.used < self._states[best].used:
+                    best = key
+            if best is None:
+                raise NoKeyAvailable(f"No {self.name} key available")
+            self._states[best].used += units
+            return best
+
+    def report(self, key, status):
+        """Record a response status for ``key``; 401/403/429 take it out of rotation"""
+        if key not in self._states:
+            return
+        with self._lock:
+            state = self._states[key]
+            state.last_status = status
+            if status not in KEY_ERROR_STATUSES:
+                state.failures = 0
+                return
+            state.failures += 1
+            cooldown = THROTTLED_COOLDOWN if status == 429 else REFUSED_COOLDOWN
+            state.down_until = time.time() + cooldown * min(state.failures, 24)
+        logger.warning("%s key ...%s out of rotation after HTTP %s", self.name, key[-4:], status)
+
+    def authorize(self, key, kwargs):
+        """Copy of request ``kwargs`` carrying ``key``"""
+        kwargs = dict(kwargs)
+        if self.param:
+            kwargs["params"] = dict(kwargs.get("params") or {}, **{self.param: key})
+        if self.header:
+            kwargs["headers"] = dict(kwargs.get("headers") or {}, **{self.header: self.prefix + key})
+        return kwargs
+
+    def stats(self):
+        """Per-key quota use and health, keys abbreviated"""
+        now = time.time()
+        with self._lock:
+            return [
+                {
+                    "key": f"...{key[-4:]}",
+                    "used_today": state.used,
+                    "healthy": state.down_until <= now,
+                    "last_status": state.last_status,
+                }
+                for key, state in self._states.items()
+            ]
+
+
+def configured_keys(name):
+    """Keys from the ``<name>s`` list setting followed by the single ``<name>`` one"""
+    keys = get_secret(f"{name}s") or []
+    if isinstance(keys, str):
+        keys = keys.split(",")
+    keys = [key.strip() for key in keys] + [(get_secret(name) or "").strip()]
+    return [key for key in keys if key]
+
+
+def _youtube():
+    quota = get_secret("youtube_daily_quota")
+    return KeyPool("youtube", configured_keys("youtube_api_key"),
+                   daily_quota=int(quota) if quota else 10000)
+
+
+def _tmdb():
+    tokens = configured_keys("tmdb_bearer_token")
+    if tokens:
+        return KeyPool("tmdb", tokens, header="Authorization", prefix="Bearer ")
+    # v3 API keys work as a query parameter
+    return KeyPool("tmdb", configured_keys("tmdb_api_key"), param="api_key")
+
+
+def _omdb():
+    return KeyPool("omdb", configured_keys("omdb_api_key"), daily_quota=1000, param="apikey")
+
+
+POOLS = {"youtube": _youtube, "tmdb": _tmdb, "omdb": _omdb}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(name):
+    """Return the process-wide key pool of an upstream"""
+    pool = _pools.get(name)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(name)
+            if pool is None:
+                pool = _pools[name] = POOLS[name]()
+    return pool
@@ -0,0 +1,292 @@
+"""
+Movie recommendations from TMDB discover, enriched with OMDb, independent
+of Streamlit.
+
+The caller passes in its page cursor and the IDs it has already shown and
+reports errors itself, so discovery also runs on the bundle page's worker
+threads and behind the JSON API. OMDb records and alternative titles are
+optional: they are skipped when the request's deadline is near
+(``retro.deadline``) and fetched in the background instead. A displayed
+card's age rating and streaming providers are always fetched in the
+background, with a short wait of their own (``card_lookups``).
+
+Every response is cut down to the fields the cards read before it is
+cached (``retro.fields``), and OMDb's full plot is only fetched for the
+card on display.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from retro import deadline, fields, http
+from retro.keys import get_pool
+from retro.state import MAX_MOVIE_RECOMMENDATIONS, MovieCard, OmdbDetails
+
+logger = logging.getLogger(__name__)
+
+# TMDB Base URLs
+TMDB_BASE_URL = "https://api.themoviedb.org/3"
+TMDB_IMAGE_BASE_URL = "https://image.tmdb.org/t/p/w500"
+OMDB_BASE_URL = "http://www.omdbapi.com/"
+
+# Cache lifetimes (seconds) for upstream responses; hot entries are
+# refreshed in the background before they expire
+TMDB_CONFIG_TTL = 5 * 60
+TMDB_DISCOVER_TTL = 60 * 60
+TMDB_DETAILS_TTL = 24 * 60 * 60
+OMDB_TTL = 24 * 60 * 60
+
+# TMDB Headers for API requests; the credentials come from the key pool
+# (``tmdb_bearer_token(s)`` or ``tmdb_api_key(s)``, see ``retro.keys``)
+TMDB_HEADERS = {"accept": "application/json"}
+
+# Language codes for TMDB API
+LANGUAGE_CODES = {
+    "English": "en",
+    "Hindi": "hi",
+    "Tamil": "ta",
+    "Telugu": "te",
+    "Kannada": "kn",
+    "Malayalam": "ml"
+}
+
+# Genre IDs for TMDB API
+GENRES = {
+    "Action": 28,
+    "Comedy": 35,
+    "Drama": 18,
+    "Family": 10751,
+    "Horror": 27,
+    "Romance": 10749,
+    "Science Fiction": 878,
+    "Animation": 16
+}
+
+# Genre picked for a mood when only the mood is known (bundle page, API)
+MOOD_GENRES = {
+    "Happy": GENRES["Comedy"],
+    "Sad": GENRES["Drama"],
+    "Energetic": GENRES["Action"],
+    "Relaxed": GENRES["Family"],
+    "Stressed": GENRES["Animation"],
+    "Bored": GENRES["Science Fiction"],
+    "Adventurous": GENRES["Action"]
+}
+
+# Kids only get animated movies
+KIDS_MAX_AGE = 10
+
+# Time an optional enrichment needs left on the deadline to be started
+ENRICHMENT_TIME = 0.3
+# Time a displayed card waits for its rating and providers, past the deadline if need be
+LOOKUP_TIME = 0.5
+
+_prefetcher = ThreadPoolExecutor(max_workers=4, thread_name_prefix="movie-prefetch")
+
+
+def get_age_certification_params(age):
+    """
+    Get appropriate certification parameters based on age
+    """
+    if age <= 10:
+        certification = "G"
+    elif age <= 13:
+        certification = "PG"
+    elif age <= 16:
+        certification = "PG-13"
+    else:
+        certification = "R"
+    return {
+        "certification_country": "US",
+        "certification.lte": certification,
+        "vote_average.lte": 10,
+        "vote_average.gte": 0,
+        "include_adult": age > 16
+    }
+
+
+def tmdb_available():
+    """Check if TMDB API service is available"""
+    try:
+        http.cached_json("tmdb", TMDB_CONFIG_TTL, f"{TMDB_BASE_URL}/configuration",
+                         headers=TMDB_HEADERS, keys=get_pool("tmdb"), timeout=5)
+        return True
+    except Exception:
+        return False
+
+
+def omdb_details(imdb_id):
+    """Get movie details (with the short plot) from OMDB API, or None"""
+    try:
+        params = {"i": imdb_id, "plot": "short"}
+        data = http.cached_json("omdb", OMDB_TTL, OMDB_BASE_URL, params=params,
+                                fields=fields.OMDB_DETAILS, keys=get_pool("omdb"), timeout=5)
+        if data.get('Response') == 'True':
+            return OmdbDetails.from_omdb(data)
+    except Exception as e:
+        logger.warning("OMDB details for %s failed: %s", imdb_id, e)
+    return None
+
+
+def full_plot(omdb):
+    """The full plot for a displayed card's OMDb details, falling back to the short one"""
+    if omdb.imdb_id == 'N/A' or not deadline.has_time(ENRICHMENT_TIME):
+        return omdb.plot
+    try:
+        params = {"i": omdb.imdb_id, "plot": "full"}
+        data = http.cached_json("omdb", OMDB_TTL, OMDB_BASE_URL, params=params,
+                                fields=fields.OMDB_PLOT, keys=get_pool("omdb"), timeout=5)
+        if data.get('Response') == 'True' and data.get('Plot', 'N/A') != 'N/A':
+            return data['Plot']
+    except Exception as e:
+        logger.warning("OMDB plot for %s failed: %s", omdb.imdb_id, e)
+    return omdb.plot
+
+
+def discover_params(genre_id, age, language, page):
+    """TMDB discover parameters for the preferences"""
+    language_code = LANGUAGE_CODES.get(language, 'en')
+    params = {
+        "with_genres": genre_id,
+        "with_original_language": language_code,
+        "language": f"{language_code}-{language_code.upper()}",
+        "sort_by": "popularity.desc",
+        "page": page,
+        "include_adult": False,
+        "include_video": False
+    }
+
+    # Adjust filtering criteria based on language
+    if language in ["English", "Hindi"]:
+        params.update({
+            "vote_count.gte": 100,
+            "vote_average.gte": 5.0,
+            "certification_country": "US",
+            "certification.lte": get_age_certification_params(age)['certification.lte']
+        })
+    else:
+        params.update({
+            "vote_count.gte": 20,
+            "vote_average.gte": 3.0,
+            "certification_country": "IN",
+            "sort_by": "release_date.desc"
+        })
+
+    if age <= KIDS_MAX_AGE:
+        params["with_genres"] = "16"
+    return params
+
+
+def _imdb_id(movie_id):
+    details_url = f"{TMDB_BASE_URL}/movie/{movie_id}"
+    return http.cached_json("tmdb", TMDB_DETAILS_TTL, details_url, headers=TMDB_HEADERS,
+                            keys=get_pool("tmdb"), fields=fields.TMDB_IMDB_ID, timeout=5).get("imdb_id")
+
+
+def _alternative_titles(movie_id):
+    alt_titles_url = f"{TMDB_BASE_URL}/movie/{movie_id}/alternative_titles"
+    return http.cached_json("tmdb", TMDB_DETAILS_TTL, alt_titles_url, headers=TMDB_HEADERS,
+                            keys=get_pool("tmdb"), fields=fields.TMDB_ALTERNATIVE_TITLES,
+                            timeout=5).get('titles', [])
+
+
+def release_dates(movie_id):
+    url = f"{TMDB_BASE_URL}/movie/{movie_id}/release_dates"
+    return http.cached_json("tmdb", TMDB_DETAILS_TTL, url, headers=TMDB_HEADERS,
+                            keys=get_pool("tmdb"), fields=fields.TMDB_RELEASE_DATES, timeout=5)
+
+
+def watch_providers(movie_id):
+    url = f"{TMDB_BASE_URL}/movie/{movie_id}/watch/providers"
+    return http.cached_json("tmdb", TMDB_DETAILS_TTL, url, headers=TMDB_HEADERS,
+                            keys=get_pool("tmdb"), fields=fields.TMDB_PROVIDERS, timeout=5)
+
+
+def card_lookups(movie_id):
+    """
+    Futures of a movie's release dates and watch providers, fetched in the
+    background without the caller's deadline: a page can wait
+    ``LOOKUP_TIME`` for them after its budget is spent, and whatever it
+    doesn't wait for is cached for the next view.
+    """
+    return _prefetcher.submit(release_dates, movie_id), _prefetcher.submit(watch_providers, movie_id)
+
+
+def _prefetch(movie_id):
+    """Warm the caches behind ``enrich`` (runs in the background, without a deadline)"""
+    try:
+        _alternative_titles(movie_id)
+        imdb_id = _imdb_id(movie_id)
+        if imdb_id:
+            omdb_details(imdb_id)
+    except Exception as e:
+        logger.warning("Prefetching movie %s failed: %s", movie_id, e)
+
+
+def enrich(card):
+    """
+    Fill in a card's alternative titles and OMDb record as far as the
+    current deadline allows. Whatever doesn't fit is fetched in the
+    background, so it is cached by the time the card is shown again.
+    """
+    alternative_titles = [{'title': title, 'iso_3166_1': country}
+                          for title, country in card.alternative_titles]
+    omdb = card.omdb
+    deferred = False
+    try:
+        if not alternative_titles:
+            if deadline.has_time(ENRICHMENT_TIME):
+                alternative_titles = _alternative_titles(card.id)
+            else:
+                deferred = True
+        if omdb is None:
+            # Two calls: TMDB details for the IMDb ID, then OMDb
+            if deadline.has_time(2 * ENRICHMENT_TIME):
+                imdb_id = _imdb_id(card.id)
+                if imdb_id:
+                    omdb = omdb_details(imdb_id)
+            else:
+                deferred = True
+    except Exception as e:
+        logger.info("Enrichment of movie %s deferred: %s", card.id, e)
+        deferred = True
+    if deferred:
+        _prefetcher.submit(_prefetch, card.id)
+    # Cards carry exactly the fields of a discover result, so rebuild from them
+    return MovieCard.from_tmdb(card._asdict(), card.genre_names, alternative_titles, omdb)
+
+
+def movie_card(movie):
+    """A card for a discover result, enriched as far as the deadline allows"""
+    genre_names = [name for genre_id in movie.get('genre_ids', [])
+                   for name, id in GENRES.items() if id == genre_id]
+    # Keep only the fields the movie card renders
+    return enrich(MovieCard.from_tmdb(movie, genre_names))
+
+
+def discover(genre_id, age, language, page, shown, limit=MAX_MOVIE_RECOMMENDATIONS):
+    """
+    Up to ``limit`` unseen ``MovieCard``s for the preferences from one
+    discover page, and the number of pages available. IDs of returned
+    movies are added to ``shown``.
+    """
+    language_code = LANGUAGE_CODES.get(language, 'en')
+    url = f"{TMDB_BASE_URL}/discover/movie"
+    params = discover_params(genre_id, age, language, page)
+    data = http.cached_json("tmdb", TMDB_DISCOVER_TTL, url, headers=TMDB_HEADERS, params=params,
+                            keys=get_pool("tmdb"), fields=fields.TMDB_DISCOVER, timeout=10)
+
+    cards = []
+    for movie in data.get("results", []):
+        if movie["id"] in shown:
+            continue
+        if movie.get("original_language") != language_code:
+            continue
+        if movie.get("adult", False):
+            continue
+        if age <= KIDS_MAX_AGE and 16 not in movie.get("genre_ids", []):
+            continue
+        cards.append(movie_card(movie))
+        shown.add(movie["id"])
+        if len(cards) >= limit:
+            break
+    return cards, data.get("total_pages", 1)
@@ -0,0 +1,135 @@
+"""
+Per-user progress that survives browser refreshes and reconnects.
+
+``st.session_state`` dies with the websocket session, and with it the
+current topic of every combo and the videos and movies already shown, so
+the next click after a refresh started a new topic (a new search) and
+repeated content. The pages now keep a stable client ID in the URL
+(``?client=...``), restore the progress saved under it when a session
+starts and save it again whenever it changes. The JSON API does the same
+for its ``client`` parameter.
+
+Progress lives in a local SQLite file (``progress_path`` setting,
+``.cache/progress.sqlite3`` by default) through the cache's
+``SQLiteBackend``, and is forgotten after 30 days without a visit.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from retro.config import get_secret
+from retro.state import MAX_SHOWN_MOVIES, MAX_SHOWN_VIDEOS, BoundedSet, TopicTracker
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROGRESS_PATH = os.path.join(".cache", "progress.sqlite3")
+PROGRESS_TTL = 30 * 24 * 3600
+CLIENT_PARAM = "client"
+
+# Session state keys making up a user's progress
+TOPIC_FIELDS = ("video_topics", "music_topics")
+SHOWN_FIELDS = {
+    "video_shown": MAX_SHOWN_VIDEOS,
+    "music_shown": MAX_SHOWN_VIDEOS,
+    "shown_movies": MAX_SHOWN_MOVIES,
+}
+PAGE_FIELD = "current_page"
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """The process-wide progress store"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                from retro.cache_backends import SQLiteBackend
+                _store = SQLiteBackend(get_secret("progress_path") or DEFAULT_PROGRESS_PATH)
+    return _store
+
+
+def dump(values):
+    """JSON-ready progress from a mapping of the session state keys present in it"""
+    data = {}
+    for name in TOPIC_FIELDS:
+        if name in values:
+            data[name] = [list(item) for item in values[name].items()]
+    for name in SHOWN_FIELDS:
+        if name in values:
+            data[name] = list(values[name])
+    if PAGE_FIELD in values:
+        data[PAGE_FIELD] = values[PAGE_FIELD]
+    return data
+
+
+def build(data):
+    """Session state values for saved progress (fresh ones for missing fields)"""
+    values = {}
+    for name in TOPIC_FIELDS:
+        tracker = values[name] = TopicTracker()
+        for combo_key, topic, iterations in data.get(name, ()):
+            tracker.set(combo_key, topic, iterations)
+    for name, maxlen in SHOWN_FIELDS.items():
+        values[name] = BoundedSet(maxlen, data.get(name, ()))
+    values[PAGE_FIELD] = data.get(PAGE_FIELD, 1)
+    return values
+
+
+def load(client_id):
+    """Saved progress of a client, or None"""
+    try:
+        record = get_store().get(f"progress:{client_id}")
+    except Exception as e:
+        logger.warning("Loading progress of %s failed: %s", client_id, e)
+        return None
+    return None if record is None else record[0]
+
+
+def save(client_id, data):
+    try:
+        get_store().set(f"progress:{client_id}", data, time.time(), PROGRESS_TTL, PROGRESS_TTL)
+    except Exception as e:
+        # Losing progress must not take a page down
+        logger.warning("Saving progress of %s failed: %s", client_id, e)
+
+
+def client_id(session, query_params):
+    """
+    The session's stable client ID, taken from the URL or minted, and
+    kept in the URL so a refresh brings it back
+    """
+    cid = session.get("client_id") or query_params.get(CLIENT_PARAM) or uuid.uuid4().hex
+    session["client_id"] = cid
+    if query_params.get(CLIENT_PARAM) != cid:
+        query_params[CLIENT_PARAM] = cid
+    return cid
+
+
+def restore_session(session, query_params):
+    """Fill a new session's state from the progress saved for its client, once"""
+    cid = client_id(session, query_params)
+    if session.get("progress_restored"):
+        return
+    session["progress_restored"] = True
+    data = load(cid) or {}
+    for name, value in build(data).items():
+        if name not in session:
+            session[name] = value
+    session["progress_saved"] = json.dumps(dump(session), sort_keys=True)
+
+
+def save_session(session):
+    """Save the session's progress if it changed since it was last saved"""
+    cid = session.get("client_id")
+    if not cid:
+        return
+    data = dump(session)
+    encoded = json.dumps(data, sort_keys=True)
+    if encoded != session.get("progress_saved"):
+        save(cid, data)
+        session["progress_saved"] = encoded
@@ -0,0 +1,123 @@
+"""
+Process-wide token-bucket rate limiting per upstream host.
+
+Every outbound call (``retro.http``, ``retro.youtube``, the Jikan client)
+acquires a token from its host's bucket first, so bursts from many
+sessions are smoothed here instead of being rejected upstream with 429s.
+
+Waiting callers are served in arrival order: a caller takes a token even
+when the bucket is empty (driving it negative) and sleeps until its token
+would have been refilled. A caller whose wait would exceed the bucket's
+queueing deadline gets ``RateLimited`` immediately instead.
+
+Limits can be overridden with the ``rate_limits`` setting, a table (or
+JSON object) of ``host = {rate = ..., burst = ..., max_wait = ...}``.
+"""
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+from retro.config import get_secret
+
+# host -> (tokens per second, burst size, max seconds a caller may queue)
+DEFAULT_LIMITS = {
+    # Jikan allows 3 requests per second and 60 per minute
+    "api.jikan.moe": (1, 3, 10),
+    # TMDB throttles bursts around 40-50 requests per second
+    "api.themoviedb.org": (20, 20, 5),
+    # OMDB has no published per-second limit; its daily cap per key is
+    # enforced by the key pool (retro.keys), not by pacing
+    "www.omdbapi.com": (5, 10, 2),
+    # YouTube quota is daily, but smooth bursts of search calls anyway
+    "www.googleapis.com": (10, 10, 5),
+    "youtube.googleapis.com": (10, 10, 5),
+}
+# Buckets for hosts without a configured limit
+FALLBACK_LIMIT = (10, 10, 5)
+
+
+class RateLimited(Exception):
+    """Raised when a call cannot get a token before its queueing deadline"""
+
+    def __init__(self, host, wait):
+        super().__init__(f"Rate limit for {host} exceeded (would wait {wait:.1f}s)")
+        self.host = host
+        self.wait = wait
+
+
+class TokenBucket:
+    """A token bucket refilled continuously at ``rate`` tokens per second"""
+
+    def __init__(self, host, rate, burst, max_wait):
+        self.host = host
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.max_wait = max_wait
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, max_wait=None):
+        """Take one token, sleeping in line for it if needed"""
+        max_wait = self.max_wait if max_wait is None else max_wait
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            if wait > max_wait:
+                self._tokens += 1
+                raise RateLimited(self.host, wait)
+        if wait:
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Stop handing out tokens for ``seconds`` (e.g. after a 429)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def _configured_limits():
+    overrides = get_secret("rate_limits") or {}
+    if isinstance(overrides, str):
+        overrides = json.loads(overrides)
+    limits = dict(DEFAULT_LIMITS)
+    for host, limit in dict(overrides).items():
+        default = limits.get(host, FALLBACK_LIMIT)
+        limits[host] = (
+            limit.get("rate", default[0]),
+            limit.get("burst", default[1]),
+            limit.get("max_wait", default[2]),
+        )
+    return limits
+
+
+def get_bucket(host):
+    """Return the process-wide bucket for ``host``"""
+    bucket = _buckets.get(host)
+    if bucket is None:
+        with _buckets_lock:
+            bucket = _buckets.get(host)
+            if bucket is None:
+                rate, burst, max_wait = _configured_limits().get(host, FALLBACK_LIMIT)
+                bucket = _buckets[host] = TokenBucket(host, rate, burst, max_wait)
+    return bucket
+
+
+def host_of(url):
+    """The host part of ``url`` (or ``url`` itself when it is a bare host)"""
+    return urlsplit(url).hostname or url
+
+
+def acquire(url_or_host, max_wait=None):
+    """Wait for a token for the host of ``url_or_host``"""
+    get_bucket(host_of(url_or_host)).acquire(max_wait)
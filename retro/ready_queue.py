@@ -0,0 +1,136 @@
+"""
+Ready-to-serve recommendation queues.
+
+Each mood-age-language combo (keyed like the pages' ``combo_key``) gets a
+small process-wide queue of validated, ready-to-play video IDs. A click
+pops from the queue in O(1); whenever a queue drops below its low
+watermark a background producer refills it, with one ``produce`` call per
+refill. A click finding the queue empty while a refill is in flight can
+wait for that refill instead of paying for its own search.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CAPACITY = 15
+DEFAULT_LOW_WATERMARK = 5
+# Wait before retrying a combo whose producer failed or came back empty
+RETRY_BACKOFF = 120
+PRODUCER_WORKERS = 2
+
+
+class ReadyQueue:
+    """Per-combo queues of video IDs kept topped up in the background"""
+
+    def __init__(self, name, produce, capacity=DEFAULT_CAPACITY,
+                 low_watermark=DEFAULT_LOW_WATERMARK):
+        """
+        ``produce(combo_key)`` returns an iterable of validated video IDs.
+        It runs on a worker thread, so it must not touch Streamlit APIs.
+        """
+        self.name = name
+        self.produce = produce
+        self.capacity = capacity
+        self.low_watermark = low_watermark
+        self._queues = {}
+        self._refilling = set()
+        self._retry_at = {}
+        self._lock = threading.Lock()
+        # Notified whenever a refill adds videos or ends
+        self._refilled = threading.Condition(self._lock)
+        self._executor = ThreadPoolExecutor(
+            max_workers=PRODUCER_WORKERS, thread_name_prefix=f"{name}-producer"
+        )
+
+    def pop(self, combo_key, skip=(), wait=0):
+        """
+        Take the next ready video ID for a combo, or None if the queue is
+        empty. IDs in ``skip`` (already shown to this user) are rotated to
+        the back of the queue for other users. When nothing is ready but a
+        refill is in flight, wait up to ``wait`` seconds for its videos.
+        """
+        give_up = time.monotonic() + wait
+        with self._lock:
+            video_id = self._take(combo_key, skip)
+            queue = self._queues.get(combo_key)
+            if queue is None or len(queue) < self.low_watermark:
+                self._schedule(combo_key)
+            while video_id is None and combo_key in self._refilling:
+                left = give_up - time.monotonic()
+                if left <= 0:
+                    break
+                self._refilled.wait(left)
+                video_id = self._take(combo_key, skip)
+        return video_id
+
+    def _take(self, combo_key, skip):
+        # Caller holds self._lock
+        queue = self._queues.get(combo_key)
+        if queue:
+            for _ in range(len(queue)):
+                candidate = queue.popleft()
+                if candidate not in skip:
+                    return candidate
+                queue.append(candidate)
+        return None
+
+    def warm(self, combo_keys):
+        """Start filling the queues for ``combo_keys`` in the background"""
+        with self._lock:
+            for combo_key in combo_keys:
+                if len(self._queues.get(combo_key, ())) < self.low_watermark:
+                    self._schedule(combo_key)
+
+    def __len__(self):
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _schedule(self, combo_key):
+        # Caller holds self._lock
+        if combo_key in self._refilling or time.time() < self._retry_at.get(combo_key, 0):
+            return
+        self._refilling.add(combo_key)
+        self._executor.submit(self._refill, combo_key)
+
+    def _refill(self, combo_key):
+        # One produce call (one search at most) per refill; the next pop
+        # below the low watermark schedules another
+        added = 0
+        try:
+            new_ids = list(self.produce(combo_key) or ())
+            with self._lock:
+                queue = self._queues.setdefault(combo_key, deque())
+                present = set(queue)
+                for video_id in new_ids:
+                    if len(queue) >= self.capacity:
+                        break
+                    if video_id not in present:
+                        queue.append(video_id)
+                        present.add(video_id)
+                        added += 1
+        except Exception as e:
+            logger.warning("%s: refilling %s failed: %s", self.name, combo_key, e)
+        finally:
+            with self._lock:
+                self._refilling.discard(combo_key)
+                if not added:
+                    self._retry_at[combo_key] = time.time() + RETRY_BACKOFF
+                self._refilled.notify_all()
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def get_ready_queue(name, produce, **kwargs):
+    """Return the process-wide ready queue called ``name``"""
+    queue = _queues.get(name)
+    if queue is None:
+        with _queues_lock:
+            queue = _queues.get(name)
+            if queue is None:
+                queue = _queues[name] = ReadyQueue(name, produce, **kwargs)
+    return queue
@@ -0,0 +1,75 @@
+"""
+Process-wide registry of YouTube video records.
+
+Popular videos come back from many different queries. Each video is stored
+once here, keyed by its interned ID, and the cached topic pools only hold
+tuples of IDs referring to it. Records are also written to the shared
+cache backend so other replicas can resolve IDs from their pools.
+"""
+import sys
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, NamedTuple, Optional
+
+from retro.cache import get_cache
+
+MAX_RECORDS = 20000
+# Descriptions are only used for re-ranking; the start is enough
+MAX_DESCRIPTION_LENGTH = 300
+RECORD_TTL = 7 * 24 * 3600
+
+
+class VideoRecord(NamedTuple):
+    video_id: str
+    title: str
+    description: str
+
+
+class VideoRegistry:
+    """Bounded, thread-safe map of video ID to ``VideoRecord``"""
+
+    def __init__(self, max_records=MAX_RECORDS):
+        self.max_records = max_records
+        self._records = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, video_id, title, description) -> str:
+        """Register a video and return its interned ID"""
+        video_id = sys.intern(video_id)
+        record = VideoRecord(video_id, title, (description or "")[:MAX_DESCRIPTION_LENGTH])
+        with self._lock:
+            existing = self._records.get(video_id)
+            self._records[video_id] = record
+            self._records.move_to_end(video_id)
+            while len(self._records) > self.max_records:
+                self._records.popitem(last=False)
+        if existing != record:
+            get_cache("youtube_video", RECORD_TTL).set(video_id, list(record))
+        return video_id
+
+    def get(self, video_id) -> Optional[VideoRecord]:
+        """The record for ``video_id``, from this process or the shared cache"""
+        with self._lock:
+            record = self._records.get(video_id)
+        if record is not None:
+            return record
+        stored = get_cache("youtube_video", RECORD_TTL).peek(video_id)
+        if stored is None:
+            return None
+        record = VideoRecord(sys.intern(stored[0]), stored[1], stored[2])
+        with self._lock:
+            self._records[record.video_id] = record
+            while len(self._records) > self.max_records:
+                self._records.popitem(last=False)
+        return record
+
+    def records(self, video_ids: Iterable[str]) -> List[VideoRecord]:
+        """Records for ``video_ids``, skipping unknown ones"""
+        found = (self.get(video_id) for video_id in video_ids)
+        return [record for record in found if record is not None]
+
+    def __len__(self):
+        return len(self._records)
+
+
+registry = VideoRegistry()
@@ -0,0 +1,179 @@
+"""
+Upstream traffic capture and replay.
+
+With ``upstream_mode = "capture"`` every upstream exchange made through
+``retro.http`` and ``retro.youtube`` is appended to a JSONL archive
+(``capture_file`` setting, ``.cache/capture.jsonl`` by default): when it
+was made, how long it took, the request without its credentials and the
+response status and body. Credential query parameters (``api_key``,
+``apikey``, ``key``) are stripped, tokens in JSON response bodies (e.g.
+the Spotify token exchange's ``access_token``) are redacted and headers
+are never written.
+
+With ``upstream_mode = "replay"`` the app sends nothing upstream and is
+served the archived responses instead, after the recorded latency divided
+by ``replay_speed`` (1 by default, 10 for ten times faster, 0 for no
+delay). Requests are driven by the app, so only each call's latency is
+reproduced, not when it was originally made (that offset is only used by
+``scripts/traffic_archive.py``). Requests captured several times are
+answered with each capture in turn, and requests missing from the archive
+fail like an unreachable upstream. No credentials are needed: replayed
+calls skip the key pools and rate limiters. Performance work can then be
+measured offline against the query mix, language skew and hit rates of
+real traffic.
+"""
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from retro import deadline
+from retro.config import get_secret
+
+DEFAULT_CAPTURE_FILE = os.path.join(".cache", "capture.jsonl")
+# Query parameters carrying credentials, never archived
+SECRET_PARAMS = frozenset(('api_key', 'apikey', 'key'))
+# JSON response fields carrying credentials, redacted before archiving
+SECRET_FIELDS = frozenset(('access_token', 'refresh_token', 'id_token'))
+REDACTED = "REDACTED"
+
+
+class ReplayMiss(IOError):
+    """Raised in replay mode for a request that was never captured"""
+
+
+def mode():
+    """``live``, ``capture`` or ``replay``"""
+    return (get_secret("upstream_mode") or "live").lower()
+
+
+def capture_path():
+    return get_secret("capture_file") or DEFAULT_CAPTURE_FILE
+
+
+def canonical_url(url, params=None):
+    """``url`` with ``params`` merged in, credentials dropped and the query sorted"""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    query += [(name, str(value)) for name, value in (params or {}).items() if value is not None]
+    query = sorted((name, value) for name, value in query if name not in SECRET_PARAMS)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ""))
+
+
+def _redacted(data):
+    if isinstance(data, dict):
+        return {name: REDACTED if name in SECRET_FIELDS else _redacted(value)
+                for name, value in data.items()}
+    if isinstance(data, list):
+        return [_redacted(item) for item in data]
+    return data
+
+
+def redact(body):
+    """A response body with the credential fields of its JSON (if any) redacted"""
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return body
+    redacted = _redacted(data)
+    return body if redacted == data else json.dumps(redacted, separators=(",", ":"))
+
+
+class _Capture:
+    """Appends exchanges to the archive"""
+
+    def __init__(self, path):
+        self.path = path
+        self.started = time.time()
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def record(self, kind, method, url, status, body, elapsed):
+        line = json.dumps({
+            "t": round(time.time() - self.started, 3),
+            "elapsed": round(elapsed, 4),
+            "kind": kind,
+            "method": method,
+            "url": url,
+            "status": status,
+            "body": redact(body),
+        }, separators=(",", ":"))
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class _Archive:
+    """Captured exchanges by request, served in turn"""
+
+    def __init__(self, path):
+        self.path = path
+        self._exchanges = defaultdict(list)
+        self._next = defaultdict(int)
+        self._lock = threading.Lock()
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    exchange = json.loads(line)
+                    self._exchanges[(exchange["kind"], exchange["method"], exchange["url"])].append(exchange)
+
+    def lookup(self, kind, method, url):
+        key = (kind, method, url)
+        with self._lock:
+            exchanges = self._exchanges.get(key)
+            if not exchanges:
+                raise ReplayMiss(f"No captured response for {method} {url}")
+            exchange = exchanges[self._next[key] % len(exchanges)]
+            self._next[key] += 1
+        return exchange
+
+
+_capture = None
+_archive = None
+_lock = threading.Lock()
+
+
+def _get_capture():
+    global _capture
+    if _capture is None:
+        with _lock:
+            if _capture is None:
+                _capture = _Capture(capture_path())
+    return _capture
+
+
+def _get_archive():
+    global _archive
+    if _archive is None:
+        with _lock:
+            if _archive is None:
+                _archive = _Archive(capture_path())
+    return _archive
+
+
+def record(kind, method, url, status, body, elapsed):
+    """Archive one exchange (capture mode); ``url`` must be canonical"""
+    _get_capture().record(kind, method, url, status, body, elapsed)
+
+
+def replay(kind, method, url):
+    """
+    ``(status, body)`` of the next captured exchange for a request, after
+    its recorded latency (scaled by ``replay_speed`` and bounded by the
+    current deadline)
+    """
+    exchange = _get_archive().lookup(kind, method, url)
+    speed = float(get_secret("replay_speed") or 1)
+    delay = exchange["elapsed"] / speed if speed > 0 else 0
+    left = deadline.remaining()
+    if left is not None and delay > left:
+        # The recorded call would have missed this deadline
+        time.sleep(max(left, 0))
+        raise deadline.DeadlineExceeded("Request deadline exceeded")
+    if delay:
+        time.sleep(delay)
+    return exchange["status"], exchange["body"]
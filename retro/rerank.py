@@ -0,0 +1,91 @@
+"""
+Local TF-IDF re-ranking of cached YouTube candidate pools.
+
+When a topic runs out, the pages first look at the search pools already
+cached for the combo's other queries: titles and descriptions are
+vectorized with TF-IDF, scored against the mood/age/language profile, and
+picked with maximal marginal relevance so the next video is relevant but
+unlike what the user has just seen. Only when nothing unseen is left do
+the pages spend quota on a new search.
+"""
+import math
+import re
+from collections import Counter
+
+TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+STOPWORDS = frozenset("""
+    a an and are as at be by for from in is it of on or the to with this that
+    you your our my we i me full video videos official new best top most
+""".split())
+# Weight of relevance against novelty in maximal marginal relevance
+MMR_LAMBDA = 0.7
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+def _tfidf(documents, query):
+    """L2-normalised TF-IDF rows for ``documents`` and the query vector"""
+    import numpy as np
+
+    doc_tokens = [Counter(tokenize(doc)) for doc in documents]
+    query_tokens = Counter(tokenize(query))
+    vocabulary = {}
+    for counts in doc_tokens + [query_tokens]:
+        for token in counts:
+            vocabulary.setdefault(token, len(vocabulary))
+
+    matrix = np.zeros((len(documents) + 1, len(vocabulary)), dtype=np.float32)
+    for row, counts in enumerate(doc_tokens + [query_tokens]):
+        for token, count in counts.items():
+            # Sublinear term frequency
+            matrix[row, vocabulary[token]] = 1.0 + math.log(count)
+
+    document_frequency = np.count_nonzero(matrix[:-1], axis=0)
+    idf = np.log((1.0 + len(documents)) / (1.0 + document_frequency)) + 1.0
+    matrix *= idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.where(norms == 0, 1.0, norms)
+    return matrix[:-1], matrix[-1]
+
+
+def rank(rows, profile, shown=(), k=1):
+    """
+    Pick up to ``k`` unseen video IDs from ``rows`` (``[video_id, title,
+    description]``) for a profile text, in MMR order.
+
+    Videos in ``shown`` are never returned, but the ones present in the
+    pool count as already selected, steering the pick away from them.
+    """
+    # Deduplicate while keeping the first occurrence of each video
+    unique = {}
+    for row in rows:
+        unique.setdefault(row[0], row)
+    rows = list(unique.values())
+    if not rows or all(row[0] in shown for row in rows):
+        return []
+
+    vectors, query = _tfidf([f"{title} {description}" for _, title, description in rows], profile)
+    relevance = vectors @ query
+    similarity = vectors @ vectors.T
+
+    selected = [i for i, row in enumerate(rows) if row[0] in shown]
+    candidates = [i for i, row in enumerate(rows) if row[0] not in shown]
+    picks = []
+    while candidates and len(picks) < k:
+        if selected:
+            redundancy = similarity[candidates][:, selected].max(axis=1)
+        else:
+            redundancy = 0.0
+        scores = MMR_LAMBDA * relevance[candidates] - (1 - MMR_LAMBDA) * redundancy
+        best = candidates[int(scores.argmax())]
+        picks.append(rows[best][0])
+        selected.append(best)
+        candidates.remove(best)
+    return picks
+
+
+def profile_text(mood, age_group, language, queries):
+    """Profile text for a combo: its preferences plus its catalog queries"""
+    return " ".join([mood, age_group, language] + list(queries))
@@ -0,0 +1,110 @@
+"""
+Topic schedulers for the YouTube recommenders.
+
+A scheduler decides when a combo leaves its current topic and which
+catalog query to search next. The recommenders report back whether each
+topic produced an unseen video, the same signal as the per-session topic
+iteration counts (a topic that keeps serving videos keeps counting up).
+
+* ``RandomScheduler``: the original rotation, a random query after
+  ``TOPIC_ITERATIONS`` videos or with ``TOPIC_SWITCH_CHANCE``.
+* ``BanditScheduler`` (default): Thompson sampling over each query's
+  yield, with a bonus for queries whose pool is already cached, so cheap
+  productive topics are preferred while poor ones are still retried now
+  and then.
+
+Pick one with the ``topic_scheduler`` setting; ``register_scheduler``
+adds others.
+"""
+import random
+import threading
+
+from retro.config import get_secret
+
+# A topic is dropped after this many videos
+TOPIC_ITERATIONS = 5
+# Chance of dropping a topic early in the random rotation
+TOPIC_SWITCH_CHANCE = 0.2
+# Added to the sampled yield of queries that cost no quota
+CACHED_BONUS = 0.3
+# Evidence per query is halved past this, so yields can drift
+MAX_EVIDENCE = 200
+
+
+class TopicScheduler:
+    """Interface implemented by every scheduler"""
+
+    def should_switch(self, topic, iterations):
+        """Whether a combo on ``topic`` after ``iterations`` videos should move on"""
+        return not topic or iterations >= TOPIC_ITERATIONS
+
+    def choose(self, queries, cached=()):
+        """The next topic among ``queries``; ``cached`` ones are free to search"""
+        raise NotImplementedError
+
+    def record(self, query, success):
+        """Report whether a search for ``query`` produced an unseen video"""
+
+
+class RandomScheduler(TopicScheduler):
+    def should_switch(self, topic, iterations):
+        return super().should_switch(topic, iterations) or random.random() < TOPIC_SWITCH_CHANCE
+
+    def choose(self, queries, cached=()):
+        return random.choice(queries)
+
+
+class BanditScheduler(TopicScheduler):
+    """Thompson sampling over per-query yield, shared by every session"""
+
+    def __init__(self, cached_bonus=CACHED_BONUS, max_evidence=MAX_EVIDENCE):
+        self.cached_bonus = cached_bonus
+        self.max_evidence = max_evidence
+        # query -> [successes, failures]
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _sample(self, query):
+        with self._lock:
+            successes, failures = self._stats.get(query, (0, 0))
+        return random.betavariate(successes + 1, failures + 1)
+
+    def choose(self, queries, cached=()):
+        cached = set(cached)
+        return max(
+            queries,
+            key=lambda query: self._sample(query) + (self.cached_bonus if query in cached else 0.0)
+        )
+
+    def record(self, query, success):
+        with self._lock:
+            stats = self._stats.setdefault(query, [0, 0])
+            stats[0 if success else 1] += 1
+            if stats[0] + stats[1] > self.max_evidence:
+                stats[0] //= 2
+                stats[1] //= 2
+
+    def stats(self, query):
+        """``(successes, failures)`` recorded for ``query``"""
+        with self._lock:
+            return tuple(self._stats.get(query, (0, 0)))
+
+
+SCHEDULERS = {
+    "random": RandomScheduler,
+    "bandit": BanditScheduler,
+}
+
+
+def register_scheduler(name, factory):
+    """Make a scheduler class (or factory) selectable by ``topic_scheduler``"""
+    SCHEDULERS[name] = factory
+
+
+def create_scheduler(kind=None):
+    """Build the scheduler named by ``kind`` or the ``topic_scheduler`` setting"""
+    kind = (kind or get_secret("topic_scheduler") or "bandit").lower()
+    try:
+        return SCHEDULERS[kind]()
+    except KeyError:
+        raise ValueError(f"Unknown topic scheduler: {kind}") from None
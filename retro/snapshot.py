@@ -0,0 +1,165 @@
+"""
+Cache snapshots: every cached upstream response in one file.
+
+A new replica pointed at a snapshot (``cache_snapshot`` setting) serves
+search pools, TMDB/OMDb records and validation results from it instead of
+stampeding the upstreams while it warms up. Without network access the
+snapshot's records keep being served as stale-if-error values, which
+makes an offline demo mode.
+
+File layout (version 2), all integers big-endian::
+
+    b"RETROSNP" | version u16 | exported_at f64 | index offset u64 | record count u64
+    records: key length u16 | key | zlib(JSON [value, fetched_at, ttl]), one after another
+    index:   record count x (sha1(key)[:8] | offset u64 | length u32), sorted
+
+The file is memory-mapped and the fixed-width index is binary-searched in
+place, so loading reads only the header and a lookup decodes just the one
+record it finds: startup time and memory don't grow with the snapshot.
+
+Export with ``python scripts/cache_snapshot.py export snapshot.bin``.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+from retro.cache_backends import CacheBackend
+
+MAGIC = b"RETROSNP"
+VERSION = 2
+_HEADER = struct.Struct(">8sHdQQ")
+_ENTRY = struct.Struct(">8sQI")
+_KEY_LENGTH = struct.Struct(">H")
+
+
+def _digest(key):
+    return hashlib.sha1(key.encode("utf-8")).digest()[:8]
+
+
+def export_snapshot(path, items):
+    """
+    Write ``(key, (value, fetched_at, ttl))`` pairs (e.g. a backend's
+    ``items()``) to a snapshot file; returns the number of records
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    index = []
+    with open(tmp_path, "wb") as f:
+        f.write(b"\0" * _HEADER.size)
+        for key, (value, fetched_at, ttl) in items:
+            encoded_key = key.encode("utf-8")
+            data = zlib.compress(json.dumps([value, fetched_at, ttl], separators=(",", ":")).encode("utf-8"))
+            index.append((_digest(key), f.tell(), _KEY_LENGTH.size + len(encoded_key) + len(data)))
+            f.write(_KEY_LENGTH.pack(len(encoded_key)))
+            f.write(encoded_key)
+            f.write(data)
+        index_offset = f.tell()
+        index.sort()
+        for entry in index:
+            f.write(_ENTRY.pack(*entry))
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, VERSION, time.time(), index_offset, len(index)))
+    os.replace(tmp_path, path)
+    return len(index)
+
+
+class Snapshot:
+    """A memory-mapped snapshot file, searched and decoded on demand"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.exported_at, self._index_offset, self._count = _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a cache snapshot")
+        if version != VERSION:
+            raise ValueError(f"Unsupported cache snapshot version {version} in {path}")
+
+    def _entry(self, position):
+        return _ENTRY.unpack_from(self._mmap, self._index_offset + position * _ENTRY.size)
+
+    def _key(self, offset):
+        (length,) = _KEY_LENGTH.unpack_from(self._mmap, offset)
+        start = offset + _KEY_LENGTH.size
+        return self._mmap[start:start + length].decode("utf-8")
+
+    def get(self, key):
+        """``(value, fetched_at, ttl)`` for ``key`` or None"""
+        digest = _digest(key)
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._entry(middle)[0] < digest:
+                low = middle + 1
+            else:
+                high = middle
+        # Entries sharing the digest are adjacent; the stored key tells them apart
+        while low < self._count:
+            entry_digest, offset, length = self._entry(low)
+            if entry_digest != digest:
+                break
+            if self._key(offset) == key:
+                start = offset + _KEY_LENGTH.size + len(key.encode("utf-8"))
+                value, fetched_at, ttl = json.loads(zlib.decompress(self._mmap[start:offset + length]))
+                return value, fetched_at, ttl
+            low += 1
+        return None
+
+    def keys(self):
+        """Every key, read from the records one at a time (values stay compressed)"""
+        for position in range(self._count):
+            yield self._key(self._entry(position)[1])
+
+    def __len__(self):
+        return self._count
+
+
+class SnapshotBackend(CacheBackend):
+    """
+    A live backend with a read-only snapshot underneath: reads fall
+    through to the snapshot, writes go to the live backend.
+    """
+
+    def __init__(self, live, snapshot):
+        self.live = live
+        self.snapshot = snapshot
+        # Snapshot records hidden by delete() and clear()
+        self._deleted = set()
+        self._cleared_prefixes = []
+        self._lock = threading.Lock()
+
+    def _hidden(self, key):
+        return key in self._deleted or any(key.startswith(p) for p in self._cleared_prefixes)
+
+    def get(self, key):
+        record = self.live.get(key)
+        if record is None and not self._hidden(key):
+            record = self.snapshot.get(key)
+        return record
+
+    def set(self, key, value, fetched_at, ttl, expire):
+        self.live.set(key, value, fetched_at, ttl, expire)
+
+    def delete(self, key):
+        with self._lock:
+            self._deleted.add(key)
+        self.live.delete(key)
+
+    def clear(self, prefix=""):
+        with self._lock:
+            self._cleared_prefixes.append(prefix)
+        self.live.clear(prefix)
+
+    def items(self):
+        seen = set()
+        for key, record in self.live.items():
+            seen.add(key)
+            yield key, record
+        for key in list(self.snapshot.keys()):
+            if key not in seen and not self._hidden(key):
+                yield key, self.snapshot.get(key)
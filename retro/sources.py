@@ -0,0 +1,65 @@
+"""
+Curated playlist and channel candidate sources for the YouTube pages.
+
+A playlist catalog (``video_playlists.json`` / ``music_playlists.json``)
+maps a mood and age group to playlist IDs (``PL...``) or channel IDs
+(``UC...``, read through their uploads playlist) per language, with an
+``"any"`` list used for every language::
+
+    {"Happy": {"kids": {"English": ["PL..."], "any": ["UC..."]}}}
+
+Walking a playlist costs 1 quota unit per 50 videos and every page is
+cached for all users, so combos with curated sources only fall back to
+``search.list`` (100 units) once their playlists run dry.
+"""
+import logging
+
+from retro import youtube
+from retro.catalogs import load_catalog
+from retro.deadline import DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+# Pages (of 50 videos) read from each playlist before moving on
+MAX_PAGES = 4
+
+
+class PlaylistSources:
+    """The curated playlists of every combo in a catalog"""
+
+    def __init__(self, catalog_file=None):
+        self.catalog_file = catalog_file
+
+    def playlists(self, mood, age_group, language):
+        """Playlist IDs for a combo, language-specific ones first"""
+        if not self.catalog_file:
+            return []
+        by_language = load_catalog(self.catalog_file).get(mood, {}).get(age_group, {})
+        sources = by_language.get(language, []) + by_language.get("any", [])
+        return [youtube.uploads_playlist(source) for source in sources]
+
+    def candidates(self, keys, mood, age_group, language, shown=(), limit=1):
+        """
+        Up to ``limit`` playable video IDs not in ``shown``, walking the
+        combo's playlists page by page. A playlist that fails is skipped.
+        """
+        found = []
+        for playlist_id in self.playlists(mood, age_group, language):
+            try:
+                page_token = None
+                for _ in range(MAX_PAGES):
+                    video_ids, page_token = youtube.playlist_page(keys, playlist_id, page_token)
+                    # Whole pages are validated, so the status call is cached for every user
+                    found.extend(
+                        video_id for video_id in youtube.playable(keys, video_ids)
+                        if video_id not in shown and video_id not in found
+                    )
+                    if len(found) >= limit or not page_token:
+                        break
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                logger.warning("Playlist %s failed: %s", playlist_id, e)
+            if len(found) >= limit:
+                break
+        return found[:limit]
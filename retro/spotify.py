@@ -0,0 +1,114 @@
+"""
+Spotify Web API access with an app token and bulk track pools.
+
+* One client-credentials token is shared by the whole process and
+  refreshed shortly before it expires; no user login is involved.
+* A single search fetches a pool of up to 50 tracks per query, cached
+  through ``retro.cache``.
+* Each session walks its own cursor through the pool, so one upstream
+  call serves dozens of clicks.
+"""
+import threading
+import time
+
+from retro import http
+from retro.cache import get_cache
+from retro.config import get_secret
+
+SPOTIFY_TOKEN_URL = "https://accounts.spotify.com/api/token"
+SPOTIFY_API_URL = "https://api.spotify.com/v1"
+
+POOL_SIZE = 50
+POOL_TTL = 6 * 60 * 60
+# Refresh the app token this many seconds before it expires
+TOKEN_REFRESH_MARGIN = 60
+
+
+class SpotifyAuthError(Exception):
+    """Raised when the app credentials are missing or rejected"""
+
+
+_token = None
+_token_expires_at = 0.0
+_token_lock = threading.Lock()
+
+
+def credentials():
+    """(client_id, client_secret) from settings, or None if not configured"""
+    client_id = get_secret("spotify_client_id")
+    client_secret = get_secret("spotify_client_secret")
+    if client_id and client_secret:
+        return client_id, client_secret
+    return None
+
+
+def get_app_token():
+    """Return the process-wide client-credentials token, refreshing it when due"""
+    global _token, _token_expires_at
+    if _token and time.time() < _token_expires_at - TOKEN_REFRESH_MARGIN:
+        return _token
+    with _token_lock:
+        if _token and time.time() < _token_expires_at - TOKEN_REFRESH_MARGIN:
+            return _token
+        creds = credentials()
+        if creds is None:
+            raise SpotifyAuthError("Spotify client ID and secret are not configured")
+        response = http.post(
+            SPOTIFY_TOKEN_URL,
+            data={"grant_type": "client_credentials"},
+            auth=creds,
+            timeout=10
+        )
+        if response.status_code != 200:
+            raise SpotifyAuthError(f"Spotify token request failed with status {response.status_code}")
+        data = response.json()
+        _token = data["access_token"]
+        _token_expires_at = time.time() + data.get("expires_in", 3600)
+        return _token
+
+
+def _search_tracks(query, market):
+    global _token
+    params = {"q": query, "type": "track", "limit": POOL_SIZE}
+    if market:
+        params["market"] = market
+    response = http.get(
+        f"{SPOTIFY_API_URL}/search",
+        params=params,
+        headers={"Authorization": f"Bearer {get_app_token()}"},
+        timeout=10
+    )
+    if response.status_code == 401:
+        # Token revoked early: force a new one on the next call
+        _token = None
+    if response.status_code != 200:
+        response.raise_for_status()
+    tracks = response.json().get("tracks", {}).get("items", [])
+    # [name, artist, url] rows keep the cached pool small
+    return [
+        [t["name"], t["artists"][0]["name"] if t.get("artists") else "Unknown",
+         t.get("external_urls", {}).get("spotify")]
+        for t in tracks if t
+    ]
+
+
+def track_pool(query, market=None):
+    """Up to 50 candidate tracks for ``query``, from cache when possible"""
+    # The token is taken at fetch time so background refreshes never reuse an expired one
+    return get_cache("spotify_search", POOL_TTL).get_or_fetch(
+        (query, market), lambda: _search_tracks(query, market)
+    )
+
+
+def next_track(cursors, query, market=None):
+    """
+    Next track of ``query``'s pool for one session.
+
+    ``cursors`` is the session's ``retro.state.CursorMap``; the cursor
+    wraps around once the whole pool has been shown.
+    """
+    pool = track_pool(query, market)
+    if not pool:
+        return None
+    name, artist, url = pool[cursors.advance(query) % len(pool)]
+    return {'name': name, 'artist': artist, 'external_url': url}
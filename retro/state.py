@@ -0,0 +1,199 @@
+"""
+Compact per-session state for the recommendation pages.
+
+Streamlit keeps everything in ``st.session_state`` alive for the whole
+session, so the pages store slim, slotted records here instead of raw
+upstream payloads, and every collection has a hard cap with eviction.
+The collections are also updated by worker threads (the bundle page, the
+JSON API), so they lock around every change and iterate over snapshots.
+"""
+import threading
+from collections import OrderedDict
+from typing import Iterable, NamedTuple, Optional, Tuple
+
+# Hard caps for per-session collections
+MAX_MOVIE_RECOMMENDATIONS = 20
+MAX_SHOWN_MOVIES = 500
+MAX_SHOWN_VIDEOS = 200
+MAX_TOPIC_COMBOS = 32
+MAX_CURSORS = 32
+MAX_ALTERNATIVE_TITLES = 10
+
+
+class OmdbDetails(NamedTuple):
+    """OMDB fields rendered on the movie card"""
+    imdb_rating: str = 'N/A'
+    imdb_votes: str = 'N/A'
+    metascore: str = 'N/A'
+    runtime: str = 'N/A'
+    rated: str = 'N/A'
+    awards: str = 'N/A'
+    director: str = 'N/A'
+    actors: str = 'N/A'
+    plot: str = 'N/A'
+    year: str = 'N/A'
+    country: str = 'N/A'
+    language: str = 'N/A'
+    box_office: str = 'N/A'
+    imdb_id: str = 'N/A'
+
+    @classmethod
+    def from_omdb(cls, data: dict) -> "OmdbDetails":
+        """Build details from a raw OMDB response"""
+        return cls(
+            imdb_rating=data.get('imdbRating', 'N/A'),
+            imdb_votes=data.get('imdbVotes', 'N/A'),
+            metascore=data.get('Metascore', 'N/A'),
+            runtime=data.get('Runtime', 'N/A'),
+            rated=data.get('Rated', 'N/A'),
+            awards=data.get('Awards', 'N/A'),
+            director=data.get('Director', 'N/A'),
+            actors=data.get('Actors', 'N/A'),
+            plot=data.get('Plot', 'N/A'),
+            year=data.get('Year', 'N/A'),
+            country=data.get('Country', 'N/A'),
+            language=data.get('Language', 'N/A'),
+            box_office=data.get('BoxOffice', 'N/A'),
+            imdb_id=data.get('imdbID', 'N/A')
+        )
+
+
+class MovieCard(NamedTuple):
+    """Everything the movie card renders, and nothing else"""
+    id: int
+    title: str
+    original_title: str
+    poster_path: Optional[str]
+    vote_average: float
+    vote_count: int
+    overview: str
+    genre_names: Tuple[str, ...] = ()
+    # (title, iso_3166_1) pairs
+    alternative_titles: Tuple[Tuple[str, str], ...] = ()
+    omdb: Optional[OmdbDetails] = None
+
+    @classmethod
+    def from_tmdb(cls, movie: dict, genre_names: Iterable[str] = (),
+                  alternative_titles: Iterable[dict] = (),
+                  omdb: Optional[OmdbDetails] = None) -> "MovieCard":
+        """Build a card from a TMDB discover result"""
+        titles = tuple(
+            (t.get('title', ''), t.get('iso_3166_1', ''))
+            for t in alternative_titles
+        )[:MAX_ALTERNATIVE_TITLES]
+        return cls(
+            id=movie['id'],
+            title=movie.get('title', 'No title'),
+            original_title=movie.get('original_title', ''),
+            poster_path=movie.get('poster_path'),
+            vote_average=movie.get('vote_average', 'N/A'),
+            vote_count=movie.get('vote_count', 'N/A'),
+            overview=movie.get('overview', 'No overview available'),
+            genre_names=tuple(genre_names),
+            alternative_titles=titles,
+            omdb=omdb
+        )
+
+
+class BoundedSet:
+    """Insertion-ordered set that forgets its oldest members past ``maxlen``"""
+    __slots__ = ('_items', 'maxlen', '_lock')
+
+    def __init__(self, maxlen: int, items: Iterable = ()):
+        self._items = OrderedDict()
+        self.maxlen = maxlen
+        self._lock = threading.Lock()
+        for item in items:
+            self.add(item)
+
+    def add(self, item):
+        with self._lock:
+            self._items[item] = None
+            self._items.move_to_end(item)
+            while len(self._items) > self.maxlen:
+                self._items.popitem(last=False)
+
+    def discard(self, item):
+        with self._lock:
+            self._items.pop(item, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __contains__(self, item):
+        return item in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._items))
+
+
+class TopicTracker:
+    """
+    Current topic and iteration count per mood-age-language combo.
+
+    Replaces the pair of unbounded ``defaultdict`` maps the YouTube pages
+    used to keep; only the most recently used combos are retained.
+    """
+    __slots__ = ('_combos', 'maxlen', '_lock')
+
+    def __init__(self, maxlen: int = MAX_TOPIC_COMBOS):
+        # combo_key -> (topic, iterations)
+        self._combos = OrderedDict()
+        self.maxlen = maxlen
+        self._lock = threading.Lock()
+
+    def get(self, combo_key: str) -> Tuple[str, int]:
+        """Return (topic, iterations) for a combo, ('', 0) if unseen"""
+        return self._combos.get(combo_key, ('', 0))
+
+    def set(self, combo_key: str, topic: str, iterations: int):
+        with self._lock:
+            self._combos[combo_key] = (topic, iterations)
+            self._combos.move_to_end(combo_key)
+            while len(self._combos) > self.maxlen:
+                self._combos.popitem(last=False)
+
+    def items(self) -> Iterable[Tuple[str, str, int]]:
+        """(combo_key, topic, iterations) from least to most recently used"""
+        with self._lock:
+            combos = list(self._combos.items())
+        return [(combo_key, topic, iterations) for combo_key, (topic, iterations) in combos]
+
+    def clear(self):
+        with self._lock:
+            self._combos.clear()
+
+    def __len__(self):
+        return len(self._combos)
+
+
+class CursorMap:
+    """Position per key (e.g. in a search query's result pool), most recently used kept"""
+    __slots__ = ('_positions', 'maxlen', '_lock')
+
+    def __init__(self, maxlen: int = MAX_CURSORS):
+        self._positions = OrderedDict()
+        self.maxlen = maxlen
+        self._lock = threading.Lock()
+
+    def advance(self, key) -> int:
+        """Return the current position for ``key`` (0 if unseen) and move past it"""
+        with self._lock:
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+            self._positions.move_to_end(key)
+            while len(self._positions) > self.maxlen:
+                self._positions.popitem(last=False)
+            return position
+
+    def clear(self):
+        with self._lock:
+            self._positions.clear()
+
+    def __len__(self):
+        return len(self._positions)
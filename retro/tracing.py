@@ -0,0 +1,205 @@
+"""
+Lightweight per-request tracing.
+
+A page run, fragment rerun or API request opens a root span with
+``trace``; upstream calls (``retro.http``, ``retro.youtube``), cache
+lookups (``retro.cache``) and render sections open child spans with
+``span``. Spans follow the context like deadlines do, so work fanned out
+with ``deadline.propagate`` lands in the right tree. Outside a trace
+(background refreshes, producers) ``span`` costs next to nothing.
+
+Finished traces are appended to a rotating JSONL file, one line per span
+(``trace_file`` setting, ``.cache/traces.jsonl`` by default; set
+``tracing`` to ``off`` to disable), and the pages show the tree of their
+recent runs in a debug sidebar (``?debug=1`` or the ``debug_traces``
+setting).
+"""
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+from retro.config import get_secret
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRACE_FILE = os.path.join(".cache", "traces.jsonl")
+MAX_TRACE_BYTES = 5 * 1024 * 1024
+TRACE_BACKUPS = 3
+# Finished traces kept per session for the debug sidebar
+RECENT_TRACES = 5
+
+_current = contextvars.ContextVar("retro_span", default=None)
+
+
+class Span:
+    """One timed step of a trace, with its attributes and child spans"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "duration", "attributes", "children")
+
+    def __init__(self, name, parent=None, attributes=None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.start = time.time()
+        self.duration = None
+        self.attributes = dict(attributes or {})
+        self.children = []
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def walk(self, depth=0):
+        """``(depth, span)`` pairs of this span and its descendants"""
+        yield depth, self
+        for child in list(self.children):
+            yield from child.walk(depth + 1)
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": None if self.duration is None else round(self.duration * 1000, 2),
+            "attributes": self.attributes,
+        }
+
+
+class _NoSpan:
+    """Stand-in yielded by ``span`` outside a trace"""
+
+    def set(self, **attributes):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+@contextmanager
+def _open(name, parent, attributes):
+    current = Span(name, parent, attributes)
+    if parent is not None:
+        parent.children.append(current)
+    token = _current.set(current)
+    started = time.monotonic()
+    try:
+        yield current
+    except BaseException as e:
+        current.set(error=type(e).__name__)
+        raise
+    finally:
+        current.duration = time.monotonic() - started
+        _current.reset(token)
+
+
+@contextmanager
+def span(name, **attributes):
+    """A child span of the current trace (a no-op outside one)"""
+    parent = _current.get()
+    if parent is None:
+        yield _NO_SPAN
+        return
+    with _open(name, parent, attributes) as current:
+        yield current
+
+
+@contextmanager
+def trace(name, session=None, **attributes):
+    """
+    A root span, exported when it ends; inside another trace it is just a
+    child span. With ``session`` (e.g. ``st.session_state``) the finished
+    trace is also kept for the debug sidebar.
+    """
+    parent = _current.get()
+    current = None
+    try:
+        with _open(name, parent, attributes) as current:
+            yield current
+    finally:
+        # Failed runs (marked ``error=`` by ``_open``) are the ones most worth keeping
+        if parent is None and current is not None:
+            _export(current)
+            if session is not None:
+                session.setdefault("recent_traces", deque(maxlen=RECENT_TRACES)).appendleft(current)
+
+
+def current():
+    """The innermost open span, or None outside a trace"""
+    return _current.get()
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def _enabled():
+    return str(get_secret("tracing") or "on").lower() not in ("0", "false", "off", "no")
+
+
+def _get_exporter():
+    """The JSONL logger of finished spans, or None when tracing is off"""
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                if not _enabled():
+                    _exporter = False
+                    return None
+                from logging.handlers import RotatingFileHandler
+                path = get_secret("trace_file") or DEFAULT_TRACE_FILE
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                handler = RotatingFileHandler(path, maxBytes=MAX_TRACE_BYTES,
+                                              backupCount=TRACE_BACKUPS, encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                exporter = logging.getLogger("retro.traces")
+                exporter.propagate = False
+                exporter.setLevel(logging.INFO)
+                exporter.addHandler(handler)
+                _exporter = exporter
+    return _exporter or None
+
+
+def _export(root):
+    try:
+        exporter = _get_exporter()
+        if exporter is not None:
+            for _, finished in root.walk():
+                exporter.info(json.dumps(finished.to_dict(), separators=(",", ":"), default=str))
+    except Exception as e:
+        # Tracing must never break a page
+        logger.warning("Exporting trace %s failed: %s", root.trace_id, e)
+
+
+def _format(span_):
+    duration = "…" if span_.duration is None else f"{span_.duration * 1000:.0f} ms"
+    attributes = " ".join(f"{name}={value}" for name, value in span_.attributes.items())
+    return f"{span_.name} — {duration} {attributes}".rstrip()
+
+
+def debug_sidebar(session):
+    """Show the span trees of the current and recent runs in the sidebar, if enabled"""
+    import streamlit as st
+
+    if not (get_secret("debug_traces") or st.query_params.get("debug")):
+        return
+    with st.sidebar.expander("🔍 Trace", expanded=True):
+        runs = []
+        # Called at the end of a page run, so the open span is its root
+        if _current.get() is not None:
+            runs.append(("This run (so far)", _current.get()))
+        runs.extend(("Earlier run", finished) for finished in session.get("recent_traces", ()))
+        if not runs:
+            st.caption("No traces yet.")
+        for label, root in runs:
+            st.caption(f"{label} · {root.trace_id[:8]}")
+            st.code("\n".join("  " * depth + _format(step) for depth, step in root.walk()), language=None)
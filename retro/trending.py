@@ -0,0 +1,53 @@
+"""
+Trending videos and music from YouTube's ``chart=mostPopular`` listings.
+
+A chart costs 1 quota unit per refresh instead of the 100 of a search, and
+is the same for every user of a region, so each (region, category) chart
+is cached process-wide in a ``keep_warm`` cache: once a page has asked for
+a chart, the cache's background refresher re-fetches it shortly before it
+expires, whether or not anyone reads it in between. The first request of a
+chart fetches it in the foreground.
+"""
+from retro import youtube
+from retro.cache import get_cache
+from retro.registry import registry
+from retro.videos import api_keys
+
+# Charts move during the day; a refresh is only 1 quota unit
+TRENDING_TTL = 30 * 60
+MAX_RESULTS = 25
+
+# Chart category of each medium (10 is YouTube's Music category)
+CATEGORIES = {"video": None, "music": "10"}
+# Chart regions offered by the pages
+REGION_NAMES = {"US": "United States", "IN": "India"}
+# Default chart region of each preferred language
+REGIONS = {
+    "English": "US",
+    "Hindi": "IN",
+    "Tamil": "IN",
+    "Telugu": "IN",
+    "Kannada": "IN",
+    "Malayalam": "IN"
+}
+
+
+def _key(region, category):
+    return [region, category]
+
+
+def _fetcher(region, category):
+    return lambda: youtube.most_popular(api_keys(), region, category, MAX_RESULTS)
+
+
+def chart(region, category=None):
+    """Video IDs trending in ``region`` (optionally in one category)"""
+    return get_cache("youtube_trending", TRENDING_TTL, keep_warm=True).get_or_fetch(
+        _key(region, category), _fetcher(region, category)
+    )
+
+
+def trending(medium, region, limit=6):
+    """The top ``limit`` ``VideoRecord``s of a medium's chart in ``region``"""
+    return registry.records(chart(region, CATEGORIES[medium])[:limit])
+
@@ -0,0 +1,258 @@
+"""
+YouTube video and music recommendations, independent of Streamlit.
+
+Per-user state (the ``TopicTracker`` of each combo and the ``BoundedSet``
+of videos already shown) is passed in by the caller and API errors are
+raised, so the same logic runs on the YouTube pages, on the worker threads
+of the bundle page and behind the JSON API.
+"""
+from retro import deadline, rerank, youtube
+from retro.catalogs import load_catalog
+from retro.config import get_secret
+from retro.fallbacks import FallbackPool
+from retro.keys import get_pool
+from retro.ready_queue import get_ready_queue
+from retro.scheduler import create_scheduler
+from retro.sources import PlaylistSources
+
+# Language code mapping
+LANGUAGE_CODES = {
+    "Hindi": "hi",
+    "Tamil": "ta",
+    "Telugu": "te",
+    "Kannada": "kn",
+    "Malayalam": "ml"
+}
+
+# Preferences offered by the pages
+LANGUAGES = ["English", "Hindi", "Tamil", "Telugu", "Kannada", "Malayalam"]
+MOODS = ["Happy", "Sad", "Energetic", "Relaxed", "Stressed", "Bored", "Adventurous"]
+
+# Seconds a click without a deadline waits for an in-flight ready-queue refill
+REFILL_WAIT = 3
+
+
+def get_age_group(age):
+    """
+    Determine age group based on age
+    """
+    if age <= 12:
+        return "kids"
+    elif 13 <= age <= 19:
+        return "teens"
+    else:
+        return "adults"
+
+
+def api_keys():
+    """The pool of YouTube API keys (``youtube_api_key(s)``)"""
+    return get_pool("youtube")
+
+
+class YouTubeRecommender:
+    """Picks videos for a mood, age group and language from a query catalog"""
+
+    def __init__(self, name, queries_file, fallbacks_file, search_params, localized_queries=False,
+                 playlists_file=None):
+        self.name = name
+        self.queries_file = queries_file
+        self.fallbacks_file = fallbacks_file
+        self.base_params = search_params
+        # Localized catalogs list queries per language; otherwise the
+        # language is appended to the query
+        self.localized_queries = localized_queries
+        self.fallbacks = FallbackPool(name, fallbacks_file)
+        # Curated playlists are tried before any search
+        self.sources = PlaylistSources(playlists_file)
+        self._scheduler = None
+
+    def queries(self, mood, age_group, language):
+        """
+        Search queries for a combo (localized catalogs fall back to their
+        English queries)
+        """
+        by_age = load_catalog(self.queries_file).get(mood, {}).get(age_group, [])
+        if self.localized_queries:
+            return by_age.get(language) or by_age.get("English", [])
+        if language == "English":
+            return list(by_age)
+        return [f"{topic} {language}" for topic in by_age]
+
+    def fallback(self, mood, age_group, language="English", shown=None):
+        """
+        A fallback video ID for the combo from the pool of videos served
+        before (seeded with the catalog's fallback), rotating through the
+        ones not in ``shown`` yet
+        """
+        video_id = self.fallbacks.pick(mood, age_group, language, shown or ())
+        if video_id and shown is not None:
+            shown.add(video_id)
+        return video_id
+
+    def search_params(self, query, language):
+        """
+        Search parameters for a query: language-specific first, then without
+        the language filter
+        """
+        params = dict(self.base_params, q=query)
+        if language == "English":
+            return [params]
+        return [dict(params, relevanceLanguage=LANGUAGE_CODES.get(language)), params]
+
+    def search(self, query, language):
+        """
+        Get the cached search pool for a query, retrying without the language
+        filter when it comes back empty
+        """
+        for params in self.search_params(query, language):
+            video_ids = youtube.search(api_keys(), **params)
+            if video_ids:
+                return video_ids
+        return []
+
+    @property
+    def scheduler(self):
+        """The process-wide topic scheduler of this recommender"""
+        if self._scheduler is None:
+            self._scheduler = create_scheduler()
+        return self._scheduler
+
+    def is_cached(self, query, language):
+        return any(youtube.is_cached(**params) for params in self.search_params(query, language))
+
+    def choose_topic(self, queries, language):
+        cached = [query for query in queries if self.is_cached(query, language)]
+        return self.scheduler.choose(queries, cached)
+
+    def pick_from_cached_pools(self, mood, age_group, language, shown):
+        """
+        Re-rank the search pools already cached for this combo and pick the
+        best unseen video, without spending any quota
+        """
+        queries = self.queries(mood, age_group, language)
+        rows = []
+        for query in queries:
+            for params in self.search_params(query, language):
+                rows.extend(youtube.cached_rows(**params))
+        picks = rerank.rank(
+            rows, rerank.profile_text(mood, age_group, language, queries), shown=shown
+        )
+        return picks[0] if picks else None
+
+    def produce(self, combo_key):
+        """
+        Refill the ready queue of a mood-age-language combo with validated
+        videos from one topic (runs in the background)
+        """
+        mood, age_group, language = combo_key.split("-")
+        video_ids = self.sources.candidates(
+            api_keys(), mood, age_group, language, limit=self.ready_queue.capacity
+        )
+        if video_ids:
+            return video_ids
+        queries = self.queries(mood, age_group, language)
+        if not queries:
+            return []
+        query = self.choose_topic(queries, language)
+        video_ids = youtube.playable(api_keys(), self.search(query, language))
+        self.scheduler.record(query, bool(video_ids))
+        return video_ids
+
+    @property
+    def ready_queue(self):
+        return get_ready_queue(self.name, self.produce)
+
+    def warm(self):
+        """
+        Optionally fill the ready queue of every combo in the catalog up front.
+        Off by default: each combo costs a search on first fill.
+        """
+        if get_secret("prewarm_ready_queues"):
+            catalog = load_catalog(self.queries_file)
+            self.ready_queue.warm(
+                f"{mood}-{age_group}-{language}"
+                for mood in catalog
+                for age_group in catalog[mood]
+                for language in LANGUAGES
+            )
+
+    def recommend(self, mood, age_group, language, topics, shown):
+        """
+        Return the next video ID for a combo, or its fallback video when no
+        unseen one is found. ``topics`` and ``shown`` are updated in place.
+        """
+        combo_key = f"{mood}-{age_group}-{language}"
+
+        # Serve straight from the ready queue when it has a video for us; on a
+        # cold combo wait for the producer's search rather than run a second one
+        left = deadline.remaining()
+        video_id = self.ready_queue.pop(combo_key, skip=shown,
+                                        wait=REFILL_WAIT if left is None else max(left, 0))
+        if video_id:
+            return self._serve(mood, age_group, language, video_id, shown)
+
+        # Curated playlists cost 1 unit per 50 videos; search only once they run dry
+        unseen = self.sources.candidates(api_keys(), mood, age_group, language, shown)
+        if unseen:
+            return self._serve(mood, age_group, language, unseen[0], shown)
+
+        queries = self.queries(mood, age_group, language)
+        if not queries:
+            return self.fallback(mood, age_group, language, shown)
+
+        topic, iterations = topics.get(combo_key)
+        if self.scheduler.should_switch(topic, iterations):
+            # Before paying for a new topic, look for an unseen video in the pools we hold
+            video_id = self.pick_from_cached_pools(mood, age_group, language, shown)
+            if video_id:
+                return self._serve(mood, age_group, language, video_id, shown)
+            topic = self.choose_topic(queries, language)
+            iterations = 1
+        else:
+            iterations += 1
+        topics.set(combo_key, topic, iterations)
+
+        # Videos come from a process-wide registry, so a video already shown
+        # under another topic is skipped here too
+        unseen = [v for v in self.search(topic, language) if v not in shown]
+        self.scheduler.record(topic, bool(unseen))
+        if not unseen:
+            # This topic's pool is used up; try the other cached pools
+            video_id = self.pick_from_cached_pools(mood, age_group, language, shown)
+            unseen = [video_id] if video_id else []
+        if unseen:
+            return self._serve(mood, age_group, language, unseen[0], shown)
+        return self.fallback(mood, age_group, language, shown)
+
+    def _serve(self, mood, age_group, language, video_id, shown):
+        shown.add(video_id)
+        # Anything served from a search or playlist is a known-good fallback for later
+        self.fallbacks.add(mood, age_group, language, video_id)
+        return video_id
+
+
+VIDEOS = YouTubeRecommender(
+    "video", "search_queries.json", "video_fallback_videos.json",
+    dict(
+        part="snippet",
+        maxResults=5,
+        type="video",
+        videoEmbeddable="true",
+        videoSyndicated="true"
+    ),
+    playlists_file="video_playlists.json"
+)
+MUSIC = YouTubeRecommender(
+    "music", "music_queries.json", "music_fallback_videos.json",
+    dict(
+        part="snippet",
+        maxResults=5,
+        type="video",
+        videoCategoryId="10",  # Music category
+        videoDuration="medium",
+        videoEmbeddable="true",
+        videoSyndicated="true"
+    ),
+    localized_queries=True,
+    playlists_file="music_playlists.json"
+)
@@ -0,0 +1,311 @@
+"""
+Lazily built YouTube Data API clients.
+
+Building a client imports ``googleapiclient`` and parses its discovery
+document, so it only happens on the first recommendation request and the
+result is reused by every session in the process.
+"""
+import json
+import threading
+import time
+
+from retro import deadline, ratelimit, replay, tracing
+from retro.fields import (
+    YOUTUBE_CHART_FIELDS, YOUTUBE_PLAYLIST_FIELDS, YOUTUBE_SEARCH_FIELDS, YOUTUBE_STATUS_FIELDS
+)
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_key):
+    """Return the cached YouTube client for ``api_key``"""
+    client = _clients.get(api_key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(api_key)
+            if client is None:
+                from googleapiclient.discovery import build
+                client = build('youtube', 'v3', developerKey=api_key, cache_discovery=False)
+                _clients[api_key] = client
+    return client
+
+
+_local = threading.local()
+# Socket timeout without a deadline
+REQUEST_TIMEOUT = 10
+
+
+def execute(request):
+    """
+    Execute a prepared API request.
+
+    The shared client is not thread-safe, so each thread sends its
+    requests over its own ``httplib2.Http`` connection. Calls are paced
+    by the googleapis rate limiter and bounded by the current deadline.
+    """
+    with tracing.span("youtube", endpoint=getattr(request, 'methodId', None)):
+        upstream_mode = replay.mode()
+        if upstream_mode == "replay":
+            return _replayed(request)
+        bucket = ratelimit.get_bucket(ratelimit.host_of(request.uri))
+        left = deadline.remaining()
+        bucket.acquire(None if left is None else min(bucket.max_wait, max(left, 0)))
+        http = getattr(_local, 'http', None)
+        if http is None:
+            import httplib2
+            http = _local.http = httplib2.Http(timeout=REQUEST_TIMEOUT)
+        # Cap the socket timeout by the deadline, kept-alive connections included
+        http.timeout = deadline.timeout(REQUEST_TIMEOUT)
+        for conn in http.connections.values():
+            conn.timeout = http.timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(http.timeout)
+        started = time.monotonic()
+        try:
+            response = request.execute(http=http)
+        except Exception as e:
+            status = getattr(getattr(e, 'resp', None), 'status', None)
+            if status == 429:
+                bucket.pause(5)
+            if upstream_mode == "capture" and status:
+                content = getattr(e, 'content', b'') or b''
+                replay.record("youtube", request.method, replay.canonical_url(request.uri), int(status),
+                              content.decode("utf-8", "replace"), time.monotonic() - started)
+            raise
+        if upstream_mode == "capture":
+            replay.record("youtube", request.method, replay.canonical_url(request.uri), 200,
+                          json.dumps(response), time.monotonic() - started)
+        return response
+
+
+def _replayed(request):
+    """The archived response to a request, or its archived error raised again"""
+    status, body = replay.replay("youtube", request.method, replay.canonical_url(request.uri))
+    if status >= 400:
+        import httplib2
+        from googleapiclient.errors import HttpError
+        raise HttpError(httplib2.Response({"status": status, "content-type": "application/json"}),
+                        body.encode("utf-8"), uri=request.uri)
+    return json.loads(body)
+
+
+# Reasons of a 401/403 that are about the key rather than the request
+KEY_ERROR_REASONS = frozenset((
+    'quotaExceeded', 'dailyLimitExceeded', 'rateLimitExceeded', 'userRateLimitExceeded',
+    'keyInvalid', 'keyExpired', 'accessNotConfigured', 'ipRefererBlocked', 'forbidden'
+))
+
+
+def _key_error(e):
+    """The HTTP status of an error that should take its key out of rotation, or None"""
+    status = getattr(getattr(e, 'resp', None), 'status', None)
+    if status == 429:
+        return status
+    if status in (401, 403):
+        # e.g. a private playlist is a 403 too, but not the key's fault
+        details = getattr(e, 'error_details', None) or []
+        reasons = {d.get('reason') for d in details if isinstance(d, dict)}
+        if not reasons or reasons & KEY_ERROR_REASONS:
+            return status
+    return None
+
+
+# Placeholder credential of the client used to build requests in replay mode
+REPLAY_KEY = "replay"
+
+
+def call(keys, build, units=1):
+    """
+    Execute ``build(client)`` with the healthy key of ``keys`` (a
+    ``retro.keys.KeyPool``) that has the most quota left, charging it
+    ``units``. A throttled or refused key is taken out of rotation and
+    the call retried with the next one.
+    """
+    if replay.mode() == "replay":
+        # Archived responses need no key (and ``key`` is not part of their URL)
+        return execute(build(get_client(REPLAY_KEY)))
+    attempts = max(len(keys), 1)
+    for attempt in range(attempts):
+        api_key = keys.acquire(units)
+        try:
+            response = execute(build(get_client(api_key)))
+        except Exception as e:
+            status = _key_error(e)
+            if status is None:
+                raise
+            keys.report(api_key, status)
+            if attempt + 1 >= attempts:
+                raise
+            continue
+        keys.report(api_key, 200)
+        return response
+
+
+# Search results change slowly; a pool is reused for hours
+SEARCH_TTL = 6 * 3600
+# Quota cost of a search; every other call used here costs 1 unit
+SEARCH_UNITS = 100
+
+
+def _search_key(params):
+    params = {name: value for name, value in params.items() if value is not None}
+    return params, tuple(sorted(params.items()))
+
+
+def search(keys, **params):
+    """
+    Run ``search.list`` through the response cache.
+
+    Returns the pool's video IDs; titles and descriptions go to the shared
+    ``retro.registry`` so a video found by several queries is stored once.
+    ``None`` parameters are dropped, as the client library would do.
+    """
+    from retro.cache import get_cache
+    from retro.registry import registry
+
+    params, key = _search_key(params)
+
+    def fetch():
+        # Only what the registry keeps, instead of full snippets and thumbnails
+        response = call(keys, lambda client: client.search().list(fields=YOUTUBE_SEARCH_FIELDS, **params),
+                        units=SEARCH_UNITS)
+        return [
+            registry.add(
+                item['id']['videoId'],
+                item.get('snippet', {}).get('title', ''),
+                item.get('snippet', {}).get('description', '')
+            )
+            for item in response.get('items', [])
+        ]
+
+    return get_cache('youtube_search', SEARCH_TTL).get_or_fetch(key, fetch)
+
+
+def cached_rows(**params):
+    """
+    ``[video_id, title, description]`` rows of the pool for ``params`` if
+    it is already cached, without any API call
+    """
+    from retro.cache import get_cache
+    from retro.registry import registry
+
+    _, key = _search_key(params)
+    video_ids = get_cache('youtube_search', SEARCH_TTL).peek(key) or []
+    return [list(record) for record in registry.records(video_ids)]
+
+
+def is_cached(**params):
+    """Whether the pool for ``params`` can be served without an API call"""
+    from retro.cache import get_cache
+
+    _, key = _search_key(params)
+    return get_cache('youtube_search', SEARCH_TTL).peek(key) is not None
+
+
+# Curated playlists change slowly too
+PLAYLIST_TTL = 6 * 3600
+
+
+def uploads_playlist(channel_id):
+    """The uploads playlist of a channel (``UC...`` becomes ``UU...``)"""
+    return "UU" + channel_id[2:] if channel_id.startswith("UC") else channel_id
+
+
+def playlist_page(keys, playlist_id, page_token=None):
+    """
+    One page of a playlist through the response cache: ``[video_ids,
+    next_page_token]``.
+
+    A ``playlistItems.list`` call costs 1 quota unit for up to 50 videos.
+    Private and deleted entries are dropped and the records go to the
+    registry like search results.
+    """
+    from retro.cache import get_cache
+    from retro.registry import registry
+
+    def fetch():
+        params = dict(part="snippet,status", fields=YOUTUBE_PLAYLIST_FIELDS,
+                      playlistId=playlist_id, maxResults=50)
+        if page_token:
+            params["pageToken"] = page_token
+        response = call(keys, lambda client: client.playlistItems().list(**params))
+        video_ids = [
+            registry.add(
+                item['snippet']['resourceId']['videoId'],
+                item['snippet'].get('title', ''),
+                item['snippet'].get('description', '')
+            )
+            for item in response.get('items', [])
+            if item.get('snippet', {}).get('resourceId', {}).get('videoId')
+            and item.get('status', {}).get('privacyStatus') == 'public'
+        ]
+        return [video_ids, response.get('nextPageToken')]
+
+    return get_cache('youtube_playlist', PLAYLIST_TTL).get_or_fetch([playlist_id, page_token], fetch)
+
+
+# Embeddability and privacy rarely change once a video is public
+STATUS_TTL = 24 * 3600
+
+
+def playable(keys, video_ids):
+    """
+    Filter ``video_ids`` down to public, embeddable videos.
+
+    One ``videos.list`` call (1 quota unit) checks up to 50 IDs; results
+    are cached per batch.
+    """
+    from retro.cache import get_cache
+
+    video_ids = list(video_ids)[:50]
+    if not video_ids:
+        return []
+
+    def fetch():
+        response = call(keys, lambda client: client.videos().list(
+            part="status",
+            fields=YOUTUBE_STATUS_FIELDS,
+            id=",".join(video_ids),
+            maxResults=len(video_ids)
+        ))
+        return [
+            item['id'] for item in response.get('items', [])
+            if item.get('status', {}).get('embeddable')
+            and item.get('status', {}).get('privacyStatus') == 'public'
+        ]
+
+    ok = set(get_cache('youtube_status', STATUS_TTL).get_or_fetch(tuple(video_ids), fetch))
+    return [video_id for video_id in video_ids if video_id in ok]
+
+
+def most_popular(keys, region_code, category_id=None, max_results=25):
+    """
+    Playable video IDs of a ``chart=mostPopular`` listing, uncached.
+
+    One ``videos.list`` call (1 quota unit, against 100 for a search)
+    returns titles, descriptions and playability together; the records go
+    to the registry like search results.
+    """
+    from retro.registry import registry
+
+    params = dict(
+        part="snippet,status",
+        chart="mostPopular",
+        fields=YOUTUBE_CHART_FIELDS,
+        regionCode=region_code,
+        maxResults=max_results
+    )
+    if category_id:
+        params["videoCategoryId"] = category_id
+    response = call(keys, lambda client: client.videos().list(**params))
+    return [
+        registry.add(
+            item['id'],
+            item.get('snippet', {}).get('title', ''),
+            item.get('snippet', {}).get('description', '')
+        )
+        for item in response.get('items', [])
+        if item.get('status', {}).get('embeddable')
+        and item.get('status', {}).get('privacyStatus') == 'public'
+    ]
@@ -0,0 +1,68 @@
+"""
+Build the local anime index used by the anime page.
+
+Pulls every seasonal list from ``--from-year`` to the current season and
+the most popular anime of each genre offered on the page, then writes
+compact records with genre bitmasks to ``anime_index.json``. Calls go
+through the rate-limited Jikan client, so a full build takes a few
+minutes.
+
+Usage:
+    python scripts/build_anime_index.py [--from-year 2000] [--genre-pages 8]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from retro import jikan
+from retro.anime_index import DEFAULT_INDEX_PATH, compact, save_index, season_key
+
+SEASONS = ["winter", "spring", "summer", "fall"]
+# Genres offered by the anime page
+GENRE_IDS = [1, 2, 4, 8, 10, 22, 36, 30, 7, 24]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--from-year", type=int, default=2000)
+    parser.add_argument("--genre-pages", type=int, default=8,
+                        help="pages of 25 most popular anime to ingest per genre")
+    parser.add_argument("--output", default=DEFAULT_INDEX_PATH)
+    args = parser.parse_args()
+
+    records = {}
+    seasons = {}
+
+    now = time.localtime()
+    for year in range(args.from_year, now.tm_year + 1):
+        for season in SEASONS:
+            if year == now.tm_year and SEASONS.index(season) > (now.tm_mon - 1) // 3:
+                break
+            ids = []
+            for anime in jikan.iter_pages(f"/seasons/{year}/{season}", jikan.SEASON_TTL):
+                records[anime['mal_id']] = compact(anime)
+                ids.append(anime['mal_id'])
+            seasons[season_key(year, season)] = list(dict.fromkeys(ids))
+            print(f"{year} {season}: {len(ids)} anime", file=sys.stderr)
+
+    for genre_id in GENRE_IDS:
+        params = {"genres": genre_id, "order_by": "members", "sort": "desc", "limit": 25}
+        count = 0
+        for anime in jikan.iter_pages("/anime", jikan.SEARCH_TTL, params, max_pages=args.genre_pages):
+            records[anime['mal_id']] = compact(anime)
+            count += 1
+        print(f"genre {genre_id}: {count} anime", file=sys.stderr)
+
+    # Seasons refer to records by position in the written list
+    ordered = list(records.values())
+    position = {record.mal_id: i for i, record in enumerate(ordered)}
+    seasons = {key: [position[mal_id] for mal_id in ids] for key, ids in seasons.items()}
+    save_index(ordered, seasons, args.output)
+    print(f"Wrote {len(ordered)} anime, {len(seasons)} seasons to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
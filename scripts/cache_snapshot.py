@@ -0,0 +1,52 @@
+"""
+Export the response cache to a snapshot file, or describe one.
+
+Exports read the configured shared backend (``cache_backend`` = sqlite or
+redis, or ``--backend``); the in-memory backend of a running app is not
+visible from here. Point a replica at the file with the ``cache_snapshot``
+setting to boot it warm, or to run offline.
+
+Usage:
+    python scripts/cache_snapshot.py export snapshot.bin [--backend sqlite]
+    python scripts/cache_snapshot.py info snapshot.bin
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from retro.cache_backends import create_backend
+from retro.snapshot import Snapshot, export_snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="write every live cache record to a snapshot")
+    export.add_argument("path")
+    export.add_argument("--backend", help="backend to export (default: the cache_backend setting)")
+    info = commands.add_parser("info", help="show what a snapshot holds")
+    info.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        backend = create_backend(args.backend)
+        count = export_snapshot(args.path, backend.items())
+        print(f"Wrote {count} records to {args.path} ({os.path.getsize(args.path)} bytes)", file=sys.stderr)
+        if not count:
+            print("The backend is empty; the memory backend can't be exported from another process",
+                  file=sys.stderr)
+        return
+
+    snapshot = Snapshot(args.path)
+    exported = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(snapshot.exported_at))
+    print(f"{args.path}: {len(snapshot)} records, exported {exported}")
+    for name, count in sorted(Counter(key.split(":", 1)[0] for key in snapshot.keys()).items()):
+        print(f"  {name}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Import-time profile of each Streamlit page.
+
+Every page is re-executed by Streamlit on each rerun, so whatever its
+top-level imports pull in is paid on cold start and on page switches.
+This script collects the top-level imports of each page and measures
+them in a fresh interpreter with ``python -X importtime``.
+
+Usage:
+    python scripts/profile_imports.py [page.py ...]
+"""
+import ast
+import importlib.machinery
+import os
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PAGES = ["Home.py"] + sorted(
+    os.path.join("pages", name)
+    for name in os.listdir(os.path.join(ROOT_DIR, "pages"))
+    if name.endswith(".py")
+)
+
+
+def submodules(package, names):
+    """The ``package.name`` modules among ``names`` (``from package import name``)"""
+    # Resolved on disk like the profiled interpreter (run from the root) would,
+    # without importing anything
+    finder = importlib.machinery.PathFinder
+    locations = [ROOT_DIR] + sys.path
+    for part in package.split("."):
+        spec = finder.find_spec(part, locations)
+        if spec is None or not spec.submodule_search_locations:
+            return []
+        locations = list(spec.submodule_search_locations)
+    return [f"{package}.{name}" for name in names if finder.find_spec(name, locations) is not None]
+
+
+def top_level_imports(path):
+    """
+    Return the modules imported at module scope of a page, including the
+    submodules pulled in by ``from package import module``
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+            modules.extend(submodules(node.module, [alias.name for alias in node.names]))
+    return list(dict.fromkeys(modules))
+
+
+def profile(modules):
+    """Import ``modules`` in a fresh interpreter and parse -X importtime output"""
+    code = "; ".join(f"import {name}" for name in modules) or "pass"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT_DIR, capture_output=True, text=True
+    )
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        # Only imports made by the page itself are counted: nested ones are
+        # indented, and already included in their importer's cumulative time
+        if name.startswith("  "):
+            continue
+        name = name.strip()
+        if name in modules:
+            timings.append((name, int(cumulative_us)))
+    failed = result.returncode != 0
+    return timings, failed, result.stderr.strip().splitlines()[-1:] if failed else []
+
+
+def main():
+    pages = sys.argv[1:] or DEFAULT_PAGES
+    for page in pages:
+        modules = top_level_imports(os.path.join(ROOT_DIR, page))
+        timings, failed, error = profile(modules)
+        total_ms = sum(us for _, us in timings) / 1000
+        print(f"{page}: {total_ms:.1f} ms")
+        for name, us in sorted(timings, key=lambda t: -t[1])[:10]:
+            print(f"    {us / 1000:8.1f} ms  {name}")
+        if failed:
+            print(f"    import failed: {error[0] if error else 'unknown error'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Summarize a captured upstream traffic archive.
+
+Capture one by running the app with ``UPSTREAM_MODE=capture``, then replay
+it offline with ``UPSTREAM_MODE=replay`` (``REPLAY_SPEED`` to speed it
+up). This shows what the archive holds: calls per endpoint, their
+statuses and recorded latencies, and the language mix of the requests.
+
+Usage:
+    python scripts/traffic_archive.py .cache/capture.jsonl
+"""
+import argparse
+import json
+import os
+import sys
+from collections import Counter, defaultdict
+from urllib.parse import parse_qsl, urlsplit
+
+# Query parameters carrying the requested language
+LANGUAGE_PARAMS = ("relevanceLanguage", "with_original_language", "regionCode")
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path", nargs="?", default=os.path.join(".cache", "capture.jsonl"))
+    args = parser.parse_args()
+
+    latencies = defaultdict(list)
+    statuses = defaultdict(Counter)
+    languages = Counter()
+    unique = set()
+    duration = 0.0
+    with open(args.path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            exchange = json.loads(line)
+            parts = urlsplit(exchange["url"])
+            endpoint = f"{parts.netloc}{parts.path}"
+            latencies[endpoint].append(exchange["elapsed"])
+            statuses[endpoint][exchange["status"]] += 1
+            unique.add((exchange["method"], exchange["url"]))
+            duration = max(duration, exchange["t"])
+            for name, value in parse_qsl(parts.query):
+                if name in LANGUAGE_PARAMS:
+                    languages[f"{name}={value}"] += 1
+
+    total = sum(len(values) for values in latencies.values())
+    if not total:
+        print(f"{args.path}: empty", file=sys.stderr)
+        return
+    print(f"{args.path}: {total} exchanges over {duration:.0f}s, {len(unique)} distinct requests")
+    for endpoint, values in sorted(latencies.items(), key=lambda item: -len(item[1])):
+        codes = ", ".join(f"{status}: {count}" for status, count in sorted(statuses[endpoint].items()))
+        print(f"  {endpoint}: {len(values)} calls, p50 {percentile(values, 0.5) * 1000:.0f} ms, "
+              f"p95 {percentile(values, 0.95) * 1000:.0f} ms ({codes})")
+    if languages:
+        print("Languages:")
+        for language, count in languages.most_common():
+            print(f"  {language}: {count}")
+
+
+if __name__ == "__main__":
+    main()